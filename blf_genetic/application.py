@@ -19,9 +19,12 @@
 
 import argparse
 import copy
+import cPickle
+import functools
+import itertools
+import os
 import random
-
-from multiprocessing import Manager
+import Queue
 
 from ippl.genetic_algorithm.application import *
 from ippl.genetic_algorithm import crossover
@@ -29,22 +32,57 @@ from ippl.genetic_algorithm import mutation
 from ippl.genetic_algorithm import select
 from ippl.reader import *
 from ippl.bottom_left_fill.sheet_shape import RectangularSheetShape
+from ippl.bottom_left_fill.checkpoint import checkpoint_store
+from ippl.nfp import nfp_cache
+from ippl.shape.catalogue import ShapeCatalogue
 from blf_genetic.utils import BLFChromosome
+from blf_genetic.utils import shape_classes
+from blf_genetic.utils import canonical_key
+from blf_genetic.fitness_cache import FitnessCache
+from blf_genetic.fitness_store import FitnessStore
 from blf_genetic.process_pool import ProcessPool
-
-def calculate_fitness(chromosome, key, cache, blf_data):
-    chromosome.calculate_fitness(blf_data)
-    fitness = chromosome.fitness
-    cache[key] = fitness
-    print "(Cache miss)", chromosome
-
-def calculate_sheetshape(chromosome, sheetshape_list, blf_data):
+from blf_genetic.island import run_islands
+
+# The data of the profile, set once on each worker of the pools, the tasks
+# only carry the keys of the chromosomes.
+worker_data = {}
+
+def initialize_worker(blf_data):
+    worker_data.clear()
+    worker_data.update(blf_data)
+    # The placements move the shapes, each worker creates its own on the
+    # coordinates of the catalogue mapped by all of them.
+    catalogue = worker_data.get("catalogue")
+    if catalogue is not None:
+        worker_data["shapes"] = catalogue.shapes()
+
+def calculate_fitness(key, bound=None):
+    chromosome = BLFChromosome.from_key(key)
+    chromosome.calculate_fitness(worker_data, bound)
+    if chromosome.pruned:
+        print "(Pruned)", chromosome
+    else:
+        print "(Cache miss)", chromosome
+
+    return key, chromosome.fitness, chromosome.pruned
+
+def finalize_worker():
+    if checkpoint_store.signature is not None:
+        print checkpoint_store
+    if nfp_cache.signature is not None:
+        print nfp_cache
+        nfp_cache.save()
+
+def calculate_sheetshape(key, blf_data=None):
+    chromosome = BLFChromosome.from_key(key)
     print "Calculating sheetshape for", chromosome
-    sheetshape = chromosome.calculate_fitness(blf_data)
+    sheetshape = chromosome.calculate_fitness(blf_data or worker_data)
     print "Sheetshape for", chromosome, "calculated."
-    sheetshape_list.append(sheetshape)
 
-sort_by_fitness = lambda o: o.fitness
+    return sheetshape
+
+# The pruned chromosomes weren't fully placed, they are the worst ones.
+sort_by_fitness = lambda o: (o.pruned, o.fitness)
 sort_by_area = lambda s: s[0].calculate_area()
 sort_by_length = lambda s: s[0].bounding_box.size()[0]
 
@@ -61,6 +99,7 @@ class BLFApplication(Application):
         self.population_size = 100
 
         self.crossover_probability = 0.7
+        self.crossover_operator = crossover.cycle
         self.mutation_probability = 0.01
         self.gene_mutation_number = 1
         self.elite = 0.5
@@ -70,24 +109,55 @@ class BLFApplication(Application):
 
         self.pool = None
         self.jobs = 1
+        self.chunk_size = 0
 
         self.blf_data = None
-        self.fitness_cache = None
+        self.fitness_cache = FitnessCache()
+
+        self.checkpoint_file = None
+        self.checkpoint_interval = 10
+        self._random_state = None
+
+        self.prune = False
+        self.pruned = 0
+        self._worst_fitness = None
+
+        # The orientations of each shape that fit on the sheet, when they
+        # are on the chromosomes.
+        self.orientation_choices = None
+        # The copies of the same shape, see shape_classes.
+        self.gene_classes = None
+
+        self.selection = "roulette"
+        self.tournament_size = 2
+        self._sampler = None
 
     def initialize(self):
         self.show_configuration()
 
+        self.pool = ProcessPool(self.jobs, finalize_worker,
+                                initialize_worker, (self.blf_data,))
+        self.set_gene_classes()
+
+        if self.resume():
+            return
+
         self._epoch = 0
         self._best_fitness = -1
+        self._worst_fitness = None
+        self.pruned = 0
         self.next_population = []
-        self.fitness_cache = Manager().dict()
-
-        self.pool = ProcessPool(self.jobs)
+        self.fitness_cache.clear()
 
         self.calculate_all_fitness(self.population)
 
     def finalize(self):
         self.population.sort(key=sort_by_fitness)
+        self.save_checkpoint()
+        self.pool.close()
+        print self.fitness_cache
+        if self.prune:
+            print "Pruned chromosomes:", self.pruned
 
     def running(self):
         return self._epoch < self.number_of_epochs
@@ -95,19 +165,26 @@ class BLFApplication(Application):
     def select(self):
         PARENT_NUMBER = 2
 
-        worst = self.population[-1].fitness
-        relative = [(worst / float(chromosome.fitness))
-            for chromosome in self.population]
-        sumation = sum(relative)
-        partition = [(float(i) / sumation) for i in relative]
+        # The sampler is built once for each population, it is dropped when
+        # the population changes.
+        if self._sampler is None:
+            self._sampler = self.create_sampler()
+
+        return [self.population[i]
+                for i in self._sampler.draw_distinct(PARENT_NUMBER)]
 
-        parents = []
-        while len(parents) < PARENT_NUMBER:
-            chromosome = self.population[select.roulette(partition)]
-            if chromosome not in parents:
-                parents.append(chromosome)
+    def create_sampler(self):
+        # The pruned chromosomes are only drawn when there is nothing else.
+        worst = self.worst_fitness()
+        relative = [0.0 if chromosome.pruned
+                    else worst / float(chromosome.fitness)
+                    for chromosome in self.population]
 
-        return parents
+        if self.selection == "tournament":
+            return select.Tournament(relative, self.tournament_size)
+        if self.selection == "rank":
+            return select.Rank(relative)
+        return select.Roulette(relative)
 
     def crossover(self, parents):
         OFFSPRING_NUMBER = 2
@@ -119,7 +196,12 @@ class BLFApplication(Application):
             for _ in xrange(OFFSPRING_NUMBER):
                 offspring = BLFChromosome()
                 parents = [copy.copy(p1.genes), copy.copy(p2.genes)]
-                offspring.genes = crossover.cycle(parents)
+                offspring.genes = self.crossover_operator(parents)
+                if p1.orientations is not None:
+                    # The orientations are of the shapes, not of the
+                    # positions, they don't depend on the order.
+                    offspring.orientations = crossover.uniform(
+                        [p1.orientations, p2.orientations])
                 offsprings.append(offspring)
 
                 p1, p2 = p2, p1
@@ -127,6 +209,7 @@ class BLFApplication(Application):
             for parent in parents:
                 offspring = BLFChromosome()
                 offspring.genes = copy.copy(parent.genes)
+                offspring.orientations = copy.copy(parent.orientations)
                 offsprings.append(offspring)
 
         return offsprings
@@ -135,7 +218,11 @@ class BLFApplication(Application):
         if random.random() < self.mutation_probability:
             for offspring in offsprings:
                 for _ in xrange(self.gene_mutation_number):
-                    offspring.genes = mutation.random(offspring.genes)
+                    offspring.genes = mutation.random(offspring.genes,
+                                                      self.gene_classes)
+                    if offspring.orientations is not None:
+                        offspring.orientations = mutation.reset(
+                            offspring.orientations, self.orientation_choices)
 
         return offsprings
 
@@ -159,11 +246,22 @@ class BLFApplication(Application):
         print "Epochs:", self.number_of_epochs
         print "Population_size:", self.population_size
         print "Crossover probability:", self.crossover_probability
+        print "Crossover operator:", self.crossover_operator.__name__
+        print "Orientation genes:", self.orientation_choices is not None
         print "Mutation probability:", self.mutation_probability
         print "Gene mutation number:", self.gene_mutation_number
         print "Elite ratio:", self.elite
+        print "Selection:", self.selection
+        print "Engine:", self.blf_data.get("engine", "blf")
+        if self.blf_data.get("nfp_cache"):
+            print "NFP cache file:", self.blf_data["nfp_cache"]
         print "Resolution:", self.blf_data["resolution"]
         print "Jobs:", self.jobs
+        if "catalogue" in self.blf_data:
+            print self.blf_data["catalogue"]
+        print "Chunk size:", self.chunk_size or "auto"
+        if self.fitness_cache.store is not None:
+            print "Fitness store file:", self.fitness_cache.store.filename
         print "=" * 79
 
     def replace_population(self):
@@ -184,50 +282,427 @@ class BLFApplication(Application):
 
     def calculate_all_fitness(self, population):
         print "\nCalculating the fitness of population..."
-        cache_miss_chromosomes = []
-        wait = False
+        cache_miss_chromosomes = {}
 
         for chromosome in population:
-            key = tuple(chromosome.genes)
-            if key in self.fitness_cache:
-                chromosome.fitness = self.fitness_cache[key]
+            key = chromosome.key()
+            fitness = self.fitness_cache.get(key)
+            if fitness is not None:
+                chromosome.fitness = fitness
+                chromosome.pruned = False
                 print "(Cache hit!)", chromosome
             else:
-                cache_miss_chromosomes.append(chromosome)
-                self.pool.add_process(calculate_fitness,
-                    chromosome, key, self.fitness_cache, self.blf_data)
-                wait = True
+                cache_miss_chromosomes.setdefault(key, []).append(chromosome)
 
-        if wait:
-            self.pool.wait_completion()
-        for chromosome in cache_miss_chromosomes:
-            key = tuple(chromosome.genes)
-            chromosome.fitness = self.fitness_cache[key]
+        for key, fitness, pruned in self.evaluate(
+                cache_miss_chromosomes.keys(), self.fitness_bound()):
+            # The fitness of a pruned chromosome is only a lower bound.
+            if pruned:
+                self.pruned += 1
+            else:
+                self.fitness_cache.put(key, fitness)
+            for chromosome in cache_miss_chromosomes[key]:
+                chromosome.fitness = fitness
+                chromosome.pruned = pruned
 
         self.population.sort(key=sort_by_fitness)
-        self.best_chromosomes.add(self.population[0])
-        self._best_fitness = self.population[0].fitness
+        self._sampler = None
+        if not self.population[0].pruned:
+            self.best_chromosomes.add(self.population[0])
+            self._best_fitness = self.population[0].fitness
+        self._worst_fitness = self.worst_fitness()
         print "Done!"
 
         self._epoch += 1
         print ("Epoch: {} - Best fitness: {:.20f}, Average fitness: {:.20f}"
             .format(self._epoch, self._best_fitness, self.average_fitness()))
+        self.checkpoint()
+
+    def fitness_bound(self):
+        """The width above which a layout stops being placed, the worst
+        fitness of the last population, or None when not pruning.
+        """
+
+        if not self.prune:
+            return None
+
+        return self._worst_fitness
+
+    def worst_fitness(self):
+        """The fitness of the worst chromosome of the population that was
+        fully placed, or None if all of them were pruned.
+        """
+
+        for chromosome in reversed(self.population):
+            if not chromosome.pruned:
+                return chromosome.fitness
+
+        return None
+
+    def evaluate(self, keys, bound=None):
+        """Calculates the fitness of the chromosomes with the keys.
+
+        Parameters:
+            keys a list of keys of chromosomes, see BLFChromosome.key.
+            bound a real number, or None, see BLFChromosome.
+        Return:
+            A iterator over the (key, fitness, pruned) tuples, in any
+            order.
+        """
+
+        return self.pool.imap_unordered(
+            functools.partial(calculate_fitness, bound=bound), keys,
+            self.chunk_size)
+
+    def set_gene_classes(self):
+        """Finds the copies of the shapes, the fitness cache keys and the
+        mutation then don't tell them apart.
+        """
+
+        self.gene_classes = shape_classes(self.blf_data["shapes"])
+        self.fitness_cache.canonical = functools.partial(canonical_key,
+            classes=self.gene_classes)
+
+    def create_chromosome(self, key, fitness, pruned=False):
+        chromosome = BLFChromosome.from_key(key)
+        chromosome.shapes = self.blf_data["shapes"]
+        chromosome.fitness = fitness
+        chromosome.pruned = pruned
+
+        return chromosome
+
+    def fitness_signature(self):
+        """The fitness of a chromosome only means something for the same
+        profile and placement options, and its key for the same form of the
+        chromosomes, with or without the orientation genes.
+        """
+
+        blf_data = self.blf_data
+        return (blf_data.get("signature"), tuple(blf_data["resolution"]),
+                blf_data.get("engine"), blf_data.get("vectorized", False),
+                blf_data.get("skyline", False),
+                self.orientation_choices is not None)
+
+    def checkpoint(self):
+        if (self.checkpoint_file and
+                self._epoch % self.checkpoint_interval == 0):
+            self.save_checkpoint()
+
+    def save_checkpoint(self, filename=None):
+        """Saves the population, the best chromosomes, the epoch, the state
+        of the random generator and the fitness cache on the file. The file
+        is replaced at once, a run killed while saving keeps the previous
+        checkpoint.
+
+        Parameters:
+            filename a string, or None to use the checkpoint_file.
+        """
+
+        filename = filename or self.checkpoint_file
+        if not filename:
+            return
+
+        state = {
+            "signature": self.fitness_signature(),
+            "epoch": self._epoch,
+            "best_fitness": self._best_fitness,
+            "population": [(chromosome.key(), chromosome.fitness,
+                            chromosome.pruned)
+                           for chromosome in self.population],
+            "best_chromosomes": [(chromosome.key(), chromosome.fitness)
+                                 for chromosome in self.best_chromosomes],
+            "random_state": random.getstate(),
+            "fitness_cache": self.fitness_cache.items(),
+        }
+
+        temporary = "{}.{}".format(filename, os.getpid())
+        f = open(temporary, "wb")
+        try:
+            cPickle.dump(state, f, cPickle.HIGHEST_PROTOCOL)
+        finally:
+            f.close()
+        os.rename(temporary, filename)
+
+    def load_checkpoint(self, filename=None):
+        """Restores the state saved on the file, the run continues from it.
+        The chromosomes on the saved fitness cache aren't evaluated again.
+
+        Parameters:
+            filename a string, or None to use the checkpoint_file.
+        Return:
+            True if the state was restored, False if the file couldn't be
+            read, is damaged or was saved for another profile, placement
+            options or form of the chromosomes.
+        """
+
+        filename = filename or self.checkpoint_file
+        try:
+            f = open(filename, "rb")
+        except IOError:
+            return False
+
+        # A damaged or foreign file is ignored, the run starts again.
+        try:
+            state = cPickle.load(f)
+        except Exception:
+            return False
+        finally:
+            f.close()
+
+        keys = ("signature", "epoch", "best_fitness", "population",
+                "best_chromosomes", "random_state", "fitness_cache")
+        if (not isinstance(state, dict) or
+                any(key not in state for key in keys) or
+                state["signature"] != self.fitness_signature()):
+            return False
+
+        try:
+            population = [self.create_chromosome(key, fitness, pruned)
+                          for key, fitness, pruned in state["population"]]
+            best_chromosomes = set(self.create_chromosome(key, fitness)
+                for key, fitness in state["best_chromosomes"])
+            fitness_cache = [(key, fitness)
+                             for key, fitness in state["fitness_cache"]]
+        except (TypeError, ValueError):
+            return False
+
+        self.population = population
+        self._sampler = None
+        self.best_chromosomes = best_chromosomes
+        self.next_population = []
+        self._epoch = state["epoch"]
+        self._best_fitness = state["best_fitness"]
+        self._worst_fitness = self.worst_fitness()
+
+        self.fitness_cache.clear()
+        self.fitness_cache.update(fitness_cache)
+
+        # Set when the run starts, the islands seed their random generator
+        # after they are forked.
+        self._random_state = state["random_state"]
+
+        return True
+
+    def resume(self):
+        """Continues from a loaded checkpoint.
+
+        Return:
+            True if a checkpoint was loaded.
+        """
+
+        if self._random_state is None:
+            return False
+
+        random.setstate(self._random_state)
+        self._random_state = None
+        print ("Resuming on epoch {} - Best fitness: {:.20f}, "
+               "Average fitness: {:.20f}").format(self._epoch,
+            self._best_fitness, self.average_fitness())
+
+        return True
 
     def average_fitness(self):
-        def fitness_list(population):
-            for chromosome in population:
-                yield chromosome.fitness
+        """The average fitness of the chromosomes fully placed, the fitness
+        of the pruned ones is only a lower bound.
+        """
+
+        fitness_list = [chromosome.fitness for chromosome in self.population
+                        if not chromosome.pruned]
+        if not fitness_list:
+            return 0.0
+
+        return sum(fitness_list) / len(fitness_list)
+
+class SteadyStateBLFApplication(BLFApplication):
+
+    def __init__(self):
+        """Creates a SteadyStateBLFApplication object.
+
+        Instead of breeding a whole population and waiting for all of its
+        fitness, the offsprings are sent to the pool as soon as they are
+        bred and each one replaces the worst chromosome of the population,
+        if it is better, as soon as its fitness arrives. There are always
+        offsprings waiting on the pool, so the jobs don't stop at the end of
+        each generation.
+
+        An epoch is population_size offsprings.
+        """
+
+        super(SteadyStateBLFApplication, self).__init__()
+
+        self.offsprings = 0
+        self._pending = {}
+
+    def initialize(self):
+        self.offsprings = 0
+        self._pending = {}
+        super(SteadyStateBLFApplication, self).initialize()
+
+    def finalize(self):
+        while self._pending:
+            self.receive_offspring()
+        super(SteadyStateBLFApplication, self).finalize()
+
+    def update_next_population(self, offsprings):
+        for offspring in offsprings:
+            key = offspring.key()
+            fitness = self.fitness_cache.get(key)
+            if fitness is not None:
+                offspring.fitness = fitness
+                self.insert_offspring(offspring)
+            else:
+                task_id = self.pool.submit(calculate_fitness, key,
+                                           self.fitness_bound())
+                self._pending[task_id] = offspring
+
+        # Two tasks per job, one of them is ready to start while the job is
+        # sending the result of the other.
+        while len(self._pending) >= 2 * self.jobs:
+            self.receive_offspring()
+
+    def fitness_bound(self):
+        """The fitness of the worst chromosome, the offsprings wider than it
+        are dropped anyway. It only gets smaller, so it holds until the
+        offspring is received.
+        """
+
+        if not self.prune or self._worst_fitness is None:
+            return None
+
+        return self.worst_fitness()
+
+    def receive_offspring(self):
+        task_id, (key, fitness, pruned) = self.pool.next_result(
+            self._pending)
+        offspring = self._pending.pop(task_id)
+        offspring.fitness = fitness
+        offspring.pruned = pruned
+        if pruned:
+            self.pruned += 1
+        else:
+            self.fitness_cache.put(key, fitness)
+        self.insert_offspring(offspring)
+
+    def insert_offspring(self, offspring):
+        """Replaces the worst chromosome of the population by the offspring,
+        when it is better and not on the population yet. A pruned offspring
+        is wider than the worst chromosome, it is dropped.
+        """
+
+        if (not offspring.pruned and
+                sort_by_fitness(offspring) <
+                    sort_by_fitness(self.population[-1]) and
+                offspring not in self.population):
+            self.population[-1] = offspring
+            self.population.sort(key=sort_by_fitness)
+            self._sampler = None
+
+            if offspring.fitness < self._best_fitness:
+                self._best_fitness = offspring.fitness
+                self.best_chromosomes.add(offspring)
+                print "(New best)", offspring
+
+        self.offsprings += 1
+        if self.offsprings % self.population_size == 0:
+            self._epoch += 1
+            print ("Epoch: {} - Best fitness: {:.20f}, "
+                   "Average fitness: {:.20f}").format(self._epoch,
+                self._best_fitness, self.average_fitness())
+            self.checkpoint()
+
+class IslandBLFApplication(BLFApplication):
+
+    def __init__(self):
+        """Creates a IslandBLFApplication object.
+
+        The application of a island, see blf_genetic.island. It evolves its
+        own population on its process, where the fitness is calculated too.
+        Every migration_interval epochs copies of its best chromosomes are
+        sent to the outbox, and the ones waiting on the inbox are put in
+        place of the worst chromosomes, when they are better.
+        """
+
+        super(IslandBLFApplication, self).__init__()
+
+        self.migration_interval = 10
+        self.migrants = 2
+
+        self.inbox = None
+        self.outbox = None
+
+    def initialize(self):
+        initialize_worker(self.blf_data)
+        self.set_gene_classes()
+
+        if self.resume():
+            return
+
+        self._epoch = 0
+        self._best_fitness = -1
+        self._worst_fitness = None
+        self.pruned = 0
+        self.next_population = []
+        self.fitness_cache.clear()
 
-        sum_fitness = sum(fitness_list(self.population))
+        self.calculate_all_fitness(self.population)
 
-        return sum_fitness / len(self.population)
+    def finalize(self):
+        self.population.sort(key=sort_by_fitness)
+        self.save_checkpoint()
+        finalize_worker()
+        print self.fitness_cache
+        if self.prune:
+            print "Pruned chromosomes:", self.pruned
+
+    def evaluate(self, keys, bound=None):
+        return itertools.imap(
+            functools.partial(calculate_fitness, bound=bound), keys)
+
+    def calculate_all_fitness(self, population):
+        super(IslandBLFApplication, self).calculate_all_fitness(population)
+
+        if (self.outbox is not None and
+                self._epoch % self.migration_interval == 0):
+            self.migrate()
+
+    def migrate(self):
+        # The fitness of the pruned chromosomes is only a lower bound.
+        migrants = [chromosome for chromosome in self.population
+                    if not chromosome.pruned][:self.migrants]
+        self.outbox.put([(chromosome.key(), chromosome.fitness)
+                         for chromosome in migrants])
+
+        # The islands don't wait for each other, the migrants that didn't
+        # arrive yet are received on the next migration.
+        while True:
+            try:
+                migrants = self.inbox.get_nowait()
+            except Queue.Empty:
+                break
+
+            for key, fitness in migrants:
+                self.fitness_cache.put(key, fitness)
+
+                chromosome = self.create_chromosome(key, fitness)
+                if (sort_by_fitness(chromosome) <
+                        sort_by_fitness(self.population[-1]) and
+                        chromosome not in self.population):
+                    self.population[-1] = chromosome
+                    self.population.sort(key=sort_by_fitness)
+                    self._sampler = None
+
+                    if fitness < self._best_fitness:
+                        self._best_fitness = fitness
+                        self.best_chromosomes.add(chromosome)
+                        print "(Immigrant best)", chromosome
 
 def command_line_arguments():
     parser = argparse.ArgumentParser(
         description="Packs a set of shapes on a sheet using the "
         "Bottom-Left Fill algorithm and Genetic Algorithms.")
     parser.add_argument("file", type=str,
-                        help="The file containing the data of the forms")
+                        help="The file containing the data of the forms, on "
+                        "the text or the binary format")
     parser.add_argument("-o", "--out", type=str, default="out",
                         metavar="filename",
                         help="The output image (default: out)")
@@ -244,6 +719,16 @@ def command_line_arguments():
                         help="The probability of the exchange of genetic "
                         "material between a pair of chromosomes occur "
                         "(default: 0.7)")
+    parser.add_argument("--crossover", default="cycle",
+                        choices=["cycle", "partially_mapped", "order",
+                                 "edge_recombination"],
+                        help="The crossover operator, all of them keep each "
+                        "shape once on the offspring (default: cycle)")
+    parser.add_argument("--orientation_genes", action="store_true",
+                        help="Keep the orientation of each shape on the "
+                        "chromosomes, only that orientation is slid, "
+                        "instead of sliding all of them and keeping the "
+                        "best one")
     parser.add_argument("-m", "--mutation_probability", type=float,
                         metavar="probability", default=0.01,
                         help="The probability of a mutation to occur in "
@@ -256,6 +741,16 @@ def command_line_arguments():
                         help="The proportion of the population that is "
                         "considered elite (this will be the next population) "
                         "(default: 0.0)")
+    parser.add_argument("--selection",
+                        choices=["roulette", "rank", "tournament"],
+                        default="roulette",
+                        help="How the parents are selected, by a roulette on "
+                        "the fitness or on the rank of the chromosomes, or "
+                        "by tournaments (default: roulette)")
+    parser.add_argument("--tournament_size", type=int, default=2,
+                        metavar="quantity",
+                        help="The number of chromosomes on each tournament "
+                        "(default: 2)")
     parser.add_argument("-R", "--max_resolution", type=float, nargs=2,
                         metavar="number", default=(100, 1),
                         help="The max resolution used on Bottom-Left Algorithm "
@@ -267,16 +762,138 @@ def command_line_arguments():
     parser.add_argument("-j","--jobs", type=int, default=1,
                         help="The number of tasks to be executed in parallel "
                         "(default: 1)")
-
-    return parser.parse_args()
-
-def create_initial_population(shapes, population_size):
+    parser.add_argument("--steady_state", action="store_true",
+                        help="Replace the worst chromosome by each offspring "
+                        "as soon as its fitness is calculated, instead of "
+                        "replacing the population at each epoch")
+    parser.add_argument("--islands", type=int, default=1,
+                        metavar="quantity",
+                        help="The number of populations evolved on their own "
+                        "processes, exchanging their best chromosomes "
+                        "(default: 1)")
+    parser.add_argument("--migration_interval", type=int, default=10,
+                        metavar="epochs",
+                        help="The number of epochs between the migrations of "
+                        "the islands (default: 10)")
+    parser.add_argument("--migrants", type=int, default=2,
+                        metavar="quantity",
+                        help="The number of best chromosomes sent by a "
+                        "island to the next one on each migration "
+                        "(default: 2)")
+    parser.add_argument("--checkpoint_file", type=str, default=None,
+                        metavar="filename",
+                        help="The file where the state of the genetic "
+                        "algorithm is saved, to be resumed later (with "
+                        "islands, one file per island, with its number "
+                        "appended)")
+    parser.add_argument("--checkpoint_interval", type=int, default=10,
+                        metavar="epochs",
+                        help="The number of epochs between the saves of the "
+                        "checkpoint file (default: 10)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue from the state saved on the "
+                        "checkpoint file")
+    parser.add_argument("--chunk_size", type=int, default=0,
+                        metavar="quantity",
+                        help="The number of chromosomes sent to a job at "
+                        "once (0 for about 4 chunks per job) (default: 0)")
+    parser.add_argument("--orientation_jobs", type=int, default=1,
+                        metavar="quantity",
+                        help="The number of orientations of a shape slid in "
+                        "parallel when calculating the layouts of the best "
+                        "chromosomes (default: 1)")
+    parser.add_argument("--engine", choices=["blf", "nfp"], default="blf",
+                        help="The placement engine, the sliding Bottom-Left "
+                        "Fill or the no-fit polygon placement (default: blf)")
+    parser.add_argument("--checkpoints", type=int, default=256,
+                        metavar="quantity",
+                        help="The number of evaluated chromosomes whose "
+                        "placements are kept by each job, to restore the "
+                        "first shapes of the next ones (0 disables it) "
+                        "(default: 256)")
+    parser.add_argument("--nfp_cache", type=str, default=None,
+                        metavar="filename",
+                        help="The file where the no-fit polygons are kept "
+                        "between runs of the same profile")
+    parser.add_argument("--nfp_cache_size", type=int, default=65536,
+                        metavar="quantity",
+                        help="The max number of no-fit polygons kept by "
+                        "each job (default: 65536)")
+    parser.add_argument("--fitness_cache_size", type=int, default=0,
+                        metavar="quantity",
+                        help="The max number of fitness of evaluated "
+                        "chromosomes kept, the least recently used are "
+                        "evaluated again (0 for no limit) (default: 0)")
+    parser.add_argument("--fitness_store", type=str, default=None,
+                        metavar="filename",
+                        help="The SQLite file where the fitness of the "
+                        "evaluated chromosomes is kept between runs, shared "
+                        "by the runs of any profile and resolution")
+    parser.add_argument("--prune", action="store_true",
+                        help="Stop placing the shapes of a chromosome when "
+                        "its layout gets wider than the worst chromosome of "
+                        "the population, it is kept as one of the worst "
+                        "ones")
+    parser.add_argument("--compact", action="store_true",
+                        help="Keep the coordinates of each shape on a single "
+                        "buffer, smaller and faster to copy to the jobs but "
+                        "slower to place")
+    parser.add_argument("--shared_shapes", action="store_true",
+                        help="Keep the coordinates of all the shapes on a "
+                        "buffer shared by the jobs, each job creates its "
+                        "compact shapes from it instead of copying the "
+                        "shapes loaded")
+    parser.add_argument("-V", "--vectorized", action="store_true",
+                        help="Test the collisions between shapes with the "
+                        "NumPy segment kernels, when a shape and its "
+                        "neighbours have 8192 pairs of segments or more, "
+                        "below that the scalar tests are faster")
+    parser.add_argument("-A", "--analytical", action="store_true",
+                        help="Slide the shapes up in one jump, calculated "
+                        "from the vertical distances of the vertices to the "
+                        "edges of the shapes, the layouts are the same with "
+                        "fewer collision tests")
+    parser.add_argument("-S", "--skyline", action="store_true",
+                        help="Start the shapes of each column on the lowest "
+                        "free point of the sheetshape under them instead of "
+                        "its bottom, the layouts are the same but few "
+                        "positions are skipped")
+
+    args = parser.parse_args()
+    if args.resume and not args.checkpoint_file:
+        parser.error("--resume requires --checkpoint_file")
+
+    return args
+
+def fitting_orientations(blf_data):
+    """Finds the orientations of each shape not higher than the sheet, the
+    other ones are never placed. A shape with no such orientation keeps all
+    of them.
+
+    Return:
+        A list of lists of orientation indices, one for each shape.
+    """
+
+    height = blf_data["profile"]["size"][1] + 1
+    choices = []
+    for orientations in blf_data["shapes"]:
+        fitting = [j for j in xrange(len(orientations))
+                   if orientations[j].bounding_box.size()[1] <= height]
+        choices.append(fitting or range(len(orientations)))
+
+    return choices
+
+def create_initial_population(shapes, population_size,
+                              orientation_choices=None):
     population = []
     genes = range(len(shapes))
 
     chromosome = BLFChromosome()
     chromosome.genes = copy.copy(genes)
     chromosome.shapes = shapes
+    if orientation_choices:
+        chromosome.orientations = [choices[0]
+                                   for choices in orientation_choices]
     population.append(chromosome)
 
     random.shuffle(genes)
@@ -284,53 +901,128 @@ def create_initial_population(shapes, population_size):
         chromosome = BLFChromosome()
         chromosome.genes = copy.copy(genes)
         chromosome.shapes = shapes
+        if orientation_choices:
+            chromosome.orientations = [random.choice(choices)
+                                       for choices in orientation_choices]
         population.append(chromosome)
         random.shuffle(genes)
 
     return population
 
-def main():
-    args = command_line_arguments()
-
-    print "Loading data from file \"{}\"".format(args.file)
-    reader = BLFReader()
-    blf_data = reader.load(args.file)
-
-    blf_data["shapes"].sort(key=sort_by_length, reverse=True)
-
-    application = BLFApplication()
+def create_application(args, blf_data, checkpoint_file=None):
+    if args.islands > 1:
+        application = IslandBLFApplication()
+        application.migration_interval = args.migration_interval
+        application.migrants = args.migrants
+    elif args.steady_state:
+        application = SteadyStateBLFApplication()
+    else:
+        application = BLFApplication()
     application.number_of_epochs = args.epochs
     application.crossover_probability = args.crossover_probability
+    application.crossover_operator = getattr(crossover, args.crossover)
     application.mutation_probability = args.mutation_probability
     application.gene_mutation_number = args.gene_mutation_number
     application.elite = args.elite
     application.population_size = args.population
     application.jobs = args.jobs
-    blf_data["resolution"] = args.max_resolution
+    application.chunk_size = args.chunk_size
+    application.fitness_cache.capacity = args.fitness_cache_size
+    application.checkpoint_interval = args.checkpoint_interval
+    application.prune = args.prune
+    application.selection = args.selection
+    application.tournament_size = args.tournament_size
     application.blf_data = blf_data
+    if args.orientation_genes:
+        application.orientation_choices = fitting_orientations(blf_data)
+    if args.fitness_store:
+        application.fitness_cache.store = FitnessStore(args.fitness_store,
+            application.fitness_signature())
 
     # Initial random population
     application.population = create_initial_population(
-        application.blf_data["shapes"], application.population_size)
+        application.blf_data["shapes"], application.population_size,
+        application.orientation_choices)
+
+    application.checkpoint_file = checkpoint_file
+    if args.resume:
+        if application.load_checkpoint():
+            print "Checkpoint \"{}\" loaded.".format(checkpoint_file)
+        else:
+            print ("Checkpoint \"{}\" not loaded, starting from a random "
+                   "population.").format(checkpoint_file)
 
-    print "Running..."
-    application.run()
+    return application
+
+def main():
+    args = command_line_arguments()
+
+    print "Loading data from file \"{}\"".format(args.file)
+    reader = BLFReader()
+    reader.compact = args.compact
+    blf_data = reader.load(args.file)
+
+    blf_data["shapes"].sort(key=sort_by_length, reverse=True)
+
+    blf_data["resolution"] = args.max_resolution
+    blf_data["engine"] = args.engine
+    blf_data["checkpoints"] = args.checkpoints
+    blf_data["nfp_cache"] = args.nfp_cache
+    blf_data["nfp_cache_size"] = args.nfp_cache_size
+    blf_data["vectorized"] = args.vectorized
+    blf_data["analytical"] = args.analytical
+    blf_data["skyline"] = args.skyline
+    if args.shared_shapes:
+        blf_data["catalogue"] = ShapeCatalogue(blf_data["shapes"])
+
+    if args.islands > 1:
+        applications = []
+        for i in xrange(args.islands):
+            checkpoint_file = None
+            if args.checkpoint_file:
+                checkpoint_file = "{}.{}".format(args.checkpoint_file, i)
+            applications.append(create_application(args, blf_data,
+                                                   checkpoint_file))
+        applications[0].show_configuration()
+
+        print "Running on {} islands...".format(args.islands)
+        best_chromosomes = set()
+        for _, key, fitness in run_islands(applications):
+            chromosome = BLFChromosome.from_key(key)
+            chromosome.fitness = fitness
+            best_chromosomes.add(chromosome)
+    else:
+        application = create_application(args, blf_data,
+                                         args.checkpoint_file)
+
+        print "Running..."
+        application.run()
+        best_chromosomes = application.best_chromosomes
 
     sample_size = 10
-    sheetshape_list = Manager().list()
-    pool = ProcessPool(args.jobs)
-    best_chromosomes = list(application.best_chromosomes)
+    sheetshape_list = []
+    best_chromosomes = list(best_chromosomes)
     best_chromosomes.sort(key=sort_by_fitness)
 
-    for chromosome in best_chromosomes[:sample_size]:
-        pool.add_process(calculate_sheetshape, chromosome, sheetshape_list,
-            blf_data)
-
-    pool.wait_completion()
+    if args.orientation_jobs > 1:
+        # The workers of the pool can't fork, so the layouts are calculated
+        # here, one at a time, with the orientations spread over the jobs.
+        render_data = dict(blf_data)
+        render_data["orientation_jobs"] = args.orientation_jobs
+        for chromosome in best_chromosomes[:sample_size]:
+            sheetshape_list.append(calculate_sheetshape(
+                chromosome.key(), render_data))
+    else:
+        pool = ProcessPool(args.jobs, finalize_worker, initialize_worker,
+                           (blf_data,))
+        keys = [chromosome.key()
+                for chromosome in best_chromosomes[:sample_size]]
+        sheetshape_list = pool.map(calculate_sheetshape, keys)
+        pool.close()
 
     print "Rendering..."
     for i, sheetshape in enumerate(sheetshape_list):
-        size = application.blf_data["profile"]["size"]
+        size = blf_data["profile"]["size"]
         render = Render()
         render.image_size = (int(size[0] + 1), int(size[1] + 1))
         render.initialize()
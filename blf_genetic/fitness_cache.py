@@ -0,0 +1,131 @@
+#
+# Copyright (C) 2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+import collections
+
+
+class FitnessCache(object):
+
+    def __init__(self, capacity=0, store=None):
+        """Creates a FitnessCache object.
+
+        Keeps the fitness of the evaluated chromosomes, keyed by their genes,
+        on the process running the genetic algorithm. When it is full the
+        least recently used fitness is dropped.
+
+        With a store, the fitness not found on the cache is looked for on it,
+        and the fitness put on the cache is saved on it too.
+
+        The keys are passed through canonical, when it is set, so the
+        chromosomes with the same layout share their fitness.
+
+        Parameters:
+            capacity a integer, the max number of fitness kept (0 for no
+                limit).
+            store a FitnessStore object, or None.
+        """
+
+        super(FitnessCache, self).__init__()
+
+        self.capacity = capacity
+        self.store = store
+        self.canonical = None
+
+        self.hits = 0
+        self.stored_hits = 0
+        self.misses = 0
+
+        self._fitness = collections.OrderedDict()
+
+    def get(self, key):
+        """Finds the fitness of a chromosome.
+
+        Parameters:
+            key a tuple, the genes of the chromosome.
+        Return:
+            The fitness, or None if it is not on the cache.
+        """
+
+        if self.canonical:
+            key = self.canonical(key)
+
+        fitness = self._fitness.pop(key, None)
+        if fitness is None and self.store is not None:
+            fitness = self.store.get(key)
+            if fitness is not None:
+                self.stored_hits += 1
+                self._put(key, fitness)
+                return fitness
+
+        if fitness is None:
+            self.misses += 1
+            return None
+
+        self._fitness[key] = fitness
+        self.hits += 1
+
+        return fitness
+
+    def put(self, key, fitness):
+        if self.canonical:
+            key = self.canonical(key)
+
+        if self.store is not None:
+            self.store.put(key, fitness)
+        self._put(key, fitness)
+
+    def _put(self, key, fitness):
+        self._fitness.pop(key, None)
+        self._fitness[key] = fitness
+        if self.capacity:
+            while len(self._fitness) > self.capacity:
+                self._fitness.popitem(last=False)
+
+    def items(self):
+        """The (genes, fitness) tuples, the least recently used first."""
+
+        return self._fitness.items()
+
+    def update(self, items):
+        """Adds the (genes, fitness) tuples returned by items."""
+
+        for key, fitness in items:
+            self._put(key, fitness)
+
+    def clear(self):
+        self._fitness.clear()
+        self.hits = 0
+        self.stored_hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        return key in self._fitness
+
+    def __len__(self):
+        return len(self._fitness)
+
+    def __str__(self):
+        if self.store is not None:
+            return ("Fitness cache: {} chromosomes, {} hits, {} hits on the "
+                    "store ({} chromosomes), {} misses").format(len(self),
+                self.hits, self.stored_hits, len(self.store), self.misses)
+
+        return "Fitness cache: {} chromosomes, {} hits, {} misses".format(
+            len(self), self.hits, self.misses)
@@ -0,0 +1,106 @@
+#
+# Copyright (C) 2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import hashlib
+import os
+import sqlite3
+
+
+class FitnessStore(object):
+
+    def __init__(self, filename, signature):
+        """Creates a FitnessStore object.
+
+        Keeps the fitness of the evaluated chromosomes on a SQLite file,
+        shared by the runs and the processes using the same file. The fitness
+        is keyed by the signature of the profile and placement options and by
+        the genes, so a file can hold several profiles and resolutions.
+
+        The connection is opened by the process using it, the store can be
+        created before the processes are forked.
+
+        Parameters:
+            filename a string.
+            signature a object with a str identifying the profile and the
+                placement options.
+        """
+
+        super(FitnessStore, self).__init__()
+
+        self.filename = filename
+        self.signature = hashlib.md5(str(signature)).hexdigest()
+
+        self._connection = None
+        self._pid = None
+
+    @staticmethod
+    def key(genes):
+        return ",".join(str(gene) for gene in genes)
+
+    def connection(self):
+        if self._pid != os.getpid():
+            connection = sqlite3.connect(self.filename, timeout=60)
+            # The readers don't wait for the writer, and a lost fitness is
+            # only evaluated again, the commits don't wait for the disk.
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS fitness ("
+                               "signature TEXT, genes TEXT, fitness REAL, "
+                               "PRIMARY KEY (signature, genes))")
+            connection.commit()
+
+            self._connection = connection
+            self._pid = os.getpid()
+
+        return self._connection
+
+    def get(self, genes):
+        """Finds the fitness of a chromosome.
+
+        Parameters:
+            genes a tuple.
+        Return:
+            The fitness, or None if it is not on the store.
+        """
+
+        row = self.connection().execute(
+            "SELECT fitness FROM fitness WHERE signature = ? AND genes = ?",
+            (self.signature, FitnessStore.key(genes))).fetchone()
+
+        return row[0] if row else None
+
+    def put(self, genes, fitness):
+        connection = self.connection()
+        connection.execute("INSERT OR REPLACE INTO fitness VALUES (?, ?, ?)",
+                           (self.signature, FitnessStore.key(genes), fitness))
+        connection.commit()
+
+    def __len__(self):
+        row = self.connection().execute(
+            "SELECT COUNT(*) FROM fitness WHERE signature = ?",
+            (self.signature,)).fetchone()
+
+        return row[0]
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_connection"] = None
+        state["_pid"] = None
+
+        return state
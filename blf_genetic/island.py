@@ -0,0 +1,125 @@
+#
+# Copyright (C) 2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+import random
+import Queue as queue
+
+from multiprocessing import Process
+from multiprocessing import Queue
+
+
+class Island(Process):
+
+    def __init__(self, index, application, inbox, outbox, results):
+        """Creates a Island object.
+
+        Runs the genetic algorithm of the application on its own process.
+        The migrants of the application are sent to the outbox and received
+        from the inbox.
+
+        Parameters:
+            index a integer, the number of the island.
+            application a application with inbox and outbox attributes and a
+                best_chromosomes collection of chromosomes with a key
+                method.
+            inbox a Queue object.
+            outbox a Queue object.
+            results a Queue object, where the index of the island and the
+                (index, key, fitness) of the best chromosomes are put at the
+                end, or the exception that stopped the island.
+        """
+
+        super(Island, self).__init__()
+
+        self.index = index
+        self.application = application
+        self.inbox = inbox
+        self.outbox = outbox
+        self.results = results
+        self.daemon = True
+        self.start()
+
+    def run(self):
+        # The islands are forked with the same random state.
+        random.seed()
+
+        application = self.application
+        application.inbox = self.inbox
+        application.outbox = self.outbox
+        try:
+            application.run()
+            results = [(self.index, chromosome.key(), chromosome.fitness)
+                       for chromosome in application.best_chromosomes]
+        except Exception, e:
+            results = e
+
+        # The migrants nobody will receive don't hold the island.
+        self.outbox.cancel_join_thread()
+        self.results.put((self.index, results))
+
+
+def run_islands(applications):
+    """Runs each application on a island, the islands are on a ring, each one
+    sending its migrants to the next one.
+
+    Parameters:
+        applications a list of applications, see Island.
+    Return:
+        A list of (index of the island, key, fitness) tuples, the best
+        chromosomes of all the islands. The exception raised by a island is
+        raised here, and a island killed raises a RuntimeError, the other
+        islands are terminated.
+    """
+
+    size = len(applications)
+    queues = [Queue() for _ in xrange(size)]
+    results = Queue()
+
+    islands = [Island(i, application, queues[i], queues[(i + 1) % size],
+                      results)
+               for i, application in enumerate(applications)]
+
+    best_chromosomes = []
+    finished = set()
+    try:
+        while len(finished) < size:
+            try:
+                index, values = results.get(timeout=1)
+            except queue.Empty:
+                # A island that left without its results was killed, the
+                # ones that put them are only waited for.
+                for island in islands:
+                    if (island.index not in finished and
+                            not island.is_alive() and island.exitcode != 0):
+                        raise RuntimeError("Island {} exited with code "
+                            "{}.".format(island.index, island.exitcode))
+                continue
+
+            if isinstance(values, Exception):
+                raise values
+            finished.add(index)
+            best_chromosomes.extend(values)
+    finally:
+        for island in islands:
+            if island.index not in finished and island.is_alive():
+                island.terminate()
+            island.join()
+
+    return best_chromosomes
@@ -17,42 +17,248 @@
 # along with ippl.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+
+import itertools
+
 from multiprocessing import Process
 from multiprocessing import JoinableQueue
-from multiprocessing import Manager
+from multiprocessing import Queue
 
 
 class Worker(Process):
 
-    def __init__(self, queue):
+    def __init__(self, queue, results, finalizer=None, initializer=None,
+                 initargs=()):
         super(Worker, self).__init__()
 
         self.queue = queue
+        self.results = results
+        self.finalizer = finalizer
+        self.initializer = initializer
+        self.initargs = initargs
         self.daemon = True
         self.start()
 
     def run(self):
-        while True:
-            function, args, kwargs = self.queue.get()
-            try: function(*args, **kwargs)
+        if self.initializer:
+            try: self.initializer(*self.initargs)
             except Exception, e: print e
+
+        while True:
+            task = self.queue.get()
+            if task is None:
+                if self.finalizer:
+                    try: self.finalizer()
+                    except Exception, e: print e
+                self.queue.task_done()
+                break
+
+            # A task is a chunk of calls of the same function, the results
+            # of the chunk, or the exception that stopped it, are sent back
+            # at once.
+            task_id, function, calls = task
+            try:
+                results = []
+                for args, kwargs in calls:
+                    results.append(function(*args, **kwargs))
+            except Exception, e:
+                results = e
+            self.results.put((task_id, results))
             self.queue.task_done()
 
 
 class ProcessPool(object):
 
-    def __init__(self, jobs):
+    def __init__(self, jobs, finalizer=None, initializer=None, initargs=()):
+        """Creates a ProcessPool object.
+
+        Parameters:
+            jobs the number of workers.
+            finalizer a function run by each worker before leaving.
+            initializer a function run by each worker when it starts.
+            initargs the arguments of the initializer. The workers are
+                forked, so they are inherited instead of sent to them, the
+                data used by every task goes here instead of on each task.
+        """
+
         super(ProcessPool, self).__init__()
 
-        self.queue = JoinableQueue(jobs)
+        self.jobs = jobs
+        self.queue = JoinableQueue()
+        self.results = Queue()
+
+        self._task_id = 0
+        self._added = set()
+        self._received = {}
+        self._dropped = set()
 
         for _ in xrange(jobs):
-            Worker(self.queue)
+            Worker(self.queue, self.results, finalizer, initializer, initargs)
+
+    def _submit(self, function, calls):
+        task_id = self._task_id
+        self._task_id += 1
+        self.queue.put((task_id, function, calls))
+
+        return task_id
+
+    def _receive(self, task_ids):
+        """Waits for one of the tasks, the results of the other ones are kept
+        until they are asked for.
+
+        Return:
+            A (task id, results) tuple.
+        """
+
+        for task_id in task_ids:
+            if task_id in self._received:
+                return task_id, self._received.pop(task_id)
+
+        while True:
+            task_id, results = self.results.get()
+            if task_id in task_ids:
+                return task_id, results
+            if task_id in self._dropped:
+                self._dropped.remove(task_id)
+            else:
+                self._received[task_id] = results
 
     def add_process(self, func, *args, **kwargs):
-        self.queue.put((func, args, kwargs))
+        self._added.add(self._submit(func, [(args, kwargs)]))
+
+    def submit(self, func, *args, **kwargs):
+        """Adds a task to be waited for with next_result.
+
+        Return:
+            The task id.
+        """
+
+        return self._submit(func, [(args, kwargs)])
+
+    def next_result(self, task_ids):
+        """Waits for the first of the submitted tasks to finish.
+
+        Parameters:
+            task_ids a collection of task ids.
+        Return:
+            A (task id, value returned by the task) tuple. The exception
+            raised by the task is raised here.
+        """
+
+        task_id, results = self._receive(task_ids)
+        if isinstance(results, Exception):
+            raise results
+
+        return task_id, results[0]
 
     def wait_completion(self):
-        self.queue.join()
+        """Waits for the tasks added so far.
+
+        Return:
+            A list with the values returned by the tasks, in the order they
+            finished. The first exception raised by them is raised here,
+            after all of them finished.
+        """
+
+        values = []
+        error = None
+        while self._added:
+            task_id, results = self._receive(self._added)
+            self._added.remove(task_id)
+            if isinstance(results, Exception):
+                error = error or results
+            else:
+                values.extend(results)
+
+        if error:
+            raise error
+
+        return values
+
+    def _chunks(self, function, iterable, chunksize):
+        """Submits the calls of the function on each item in chunks and
+        yields the (index of the first item, results) of each chunk as it
+        finishes.
+        """
+
+        if chunksize < 1:
+            # The same default of multiprocessing.Pool.map.
+            items = list(iterable)
+            chunksize, extra = divmod(len(items), self.jobs * 4)
+            if extra:
+                chunksize += 1
+            iterable = items
+
+        iterator = iter(iterable)
+        starts = {}
+        start = 0
+        while True:
+            chunk = list(itertools.islice(iterator, chunksize))
+            if not chunk:
+                break
+            calls = [((item,), {}) for item in chunk]
+            starts[self._submit(function, calls)] = start
+            start += len(chunk)
+
+        while starts:
+            task_id, results = self._receive(starts)
+            start = starts.pop(task_id)
+            if isinstance(results, Exception):
+                self._drop(starts)
+                raise results
+            yield start, results
+
+    def _drop(self, task_ids):
+        """Drops the results of tasks nobody waits for anymore."""
 
+        for task_id in task_ids:
+            if self._received.pop(task_id, None) is None:
+                self._dropped.add(task_id)
+
+    def imap_unordered(self, function, iterable, chunksize=1):
+        """Calls the function on each item, on the workers.
+
+        Parameters:
+            function a function of one argument, defined on a module.
+            iterable the items.
+            chunksize a integer, the number of items sent to a worker at
+                once, 0 to split the items in about 4 chunks per job.
+        Return:
+            A iterator over the values returned by the function, in the
+            order they finished. An exception raised by the function is
+            raised here.
+        """
+
+        for _, results in self._chunks(function, iterable, chunksize):
+            for result in results:
+                yield result
+
+    def map(self, function, iterable, chunksize=1):
+        """Same as imap_unordered, but waits for all the items.
+
+        Return:
+            A list of the values returned by the function, in the order of
+            the items.
+        """
+
+        values = []
+        for start, results in self._chunks(function, iterable, chunksize):
+            if len(values) < start + len(results):
+                values.extend([None] * (start + len(results) - len(values)))
+            values[start:start + len(results)] = results
+
+        return values
+
+    def close(self):
+        """Stops the workers, each one runs the finalizer before leaving.
+
+        Return:
+            The values returned by the tasks added, see wait_completion.
+        """
+
+        values = self.wait_completion()
+        for _ in xrange(self.jobs):
+            self.queue.put(None)
+        self.queue.join()
 
+        return values
@@ -17,11 +17,11 @@
 # along with ippl.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-import copy
-
 from Queue import Queue
 from threading import Thread
 
+from ippl.shape.catalogue import ShapeCatalogue
+
 
 class Worker(Thread):
 
@@ -44,9 +44,13 @@ class ThreadPool(object):
     def __init__(self, jobs, blf_data):
         super(ThreadPool, self).__init__()
 
+        # The jobs share the data, but each one places its own shapes.
+        catalogue = ShapeCatalogue(blf_data["shapes"])
         self.data_queue = []
         for _ in xrange(jobs):
-            self.data_queue.append(copy.deepcopy(blf_data))
+            data = dict(blf_data)
+            data["shapes"] = catalogue.shapes()
+            self.data_queue.append(data)
 
         self.tasks = Queue(jobs)
         for _ in xrange(jobs):
@@ -17,7 +17,11 @@
 # along with ippl.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import itertools
+
 from ippl.bottom_left_fill import *
+from ippl.nfp import NoFitPolygonPlacement
+from ippl.nfp import nfp_cache
 from ippl.genetic_algorithm.chromosome import Chromosome
 
 
@@ -27,42 +31,193 @@ class BLFChromosome(Chromosome):
         super(BLFChromosome, self).__init__()
 
         self.shapes = []
+        self.pruned = False
+        # The orientation of each shape, or None to try all of them and keep
+        # the best one on each placement.
+        self.orientations = None
+
+    @staticmethod
+    def from_key(key):
+        """Creates a BLFChromosome with the genes (and orientations) of the
+        key.
+        """
+
+        chromosome = BLFChromosome()
+        if key and isinstance(key[0], tuple):
+            genes, orientations = key
+            chromosome.orientations = list(orientations)
+        else:
+            genes = key
+        chromosome.genes = list(genes)
+
+        return chromosome
+
+    def key(self):
+        """The genes tuple, or the (genes, orientations) tuple when the
+        orientations are on the chromosome. Keys the fitness caches and is
+        sent to the workers.
+        """
+
+        if self.orientations is None:
+            return tuple(self.genes)
+
+        return (tuple(self.genes), tuple(self.orientations))
+
+    def calculate_fitness(self, blf_data, bound=None):
+        """Places the shapes in the order of the genes, the fitness is the
+        width of the layout.
+
+        Parameters:
+            blf_data the data of the profile.
+            bound a real number, or None. The placement stops when the layout
+                gets wider than it, pruned is set and the fitness is the width
+                of the shapes placed so far, a lower bound of the fitness.
+        Return:
+            The sheetshape.
+        """
 
-    def calculate_fitness(self, blf_data):
         self.shapes = blf_data["shapes"]
 
-        blf = BottomLeftFill()
+        if blf_data.get("engine") == "nfp":
+            blf = NoFitPolygonPlacement()
+            nfp_cache.capacity = blf_data.get("nfp_cache_size",
+                                              nfp_cache.capacity)
+            nfp_cache.bind(blf_data.get("signature"),
+                           blf_data.get("nfp_cache"))
+            blf.cache = nfp_cache
+        else:
+            blf = BottomLeftFill()
         resolution = blf_data["resolution"]
         blf.resolution = Point(resolution[0], resolution[1])
+        blf.vectorized = blf_data.get("vectorized", False)
+        blf.analytical = blf_data.get("analytical", False)
+        blf.skyline = blf_data.get("skyline", False)
+        blf.jobs = blf_data.get("orientation_jobs", 1)
+        blf.bound = bound
 
         size = blf_data["profile"]["size"]
         sheetshape = RectangularSheetShape()
         blf.sheetshape.rectangle = Rectangle(0, 0, size[0] + 1, size[1] + 1)
         blf.shapes = self
 
-        bounding_box = blf.run()
+        if blf_data.get("engine") == "nfp":
+            bounding_box = blf.run()
+        else:
+            # The shapes placed by an already evaluated chromosome with the
+            # same first shapes are restored instead of placed again. The
+            # copies of a shape are placed the same, the sequence has the
+            # classes of the genes, see shape_classes.
+            classes = blf_data.get("shape_classes")
+            if classes is None:
+                classes = shape_classes(self.shapes)
+                blf_data["shape_classes"] = classes
+            sequence = tuple(classes[gene] for gene in self.genes)
+            if self.orientations is not None:
+                sequence = tuple(zip(sequence, (self.orientations[gene]
+                                                for gene in self.genes)))
+            checkpoint_store.capacity = blf_data.get("checkpoints",
+                checkpoint_store.capacity)
+            checkpoint_store.bind((blf_data.get("signature"),
+                tuple(resolution), blf.vectorized, blf.skyline))
+            bounding_box = blf.run(checkpoint_store.get(sequence))
+            checkpoint_store.put(sequence[:len(blf.checkpoints)],
+                                 blf.checkpoints)
         self.fitness = bounding_box.size()[0]
+        self.pruned = blf.pruned
 
         return blf.sheetshape
 
     def __eq__(self, other):
-        return self.genes == other.genes
+        return self.key() == other.key()
 
     def __hash__(self):
-        return hash(tuple(self.genes))
+        return hash(self.key())
 
     def __radd__(self, other):
         return other.fitness + self.fitness
 
     def __getitem__(self, index):
-        return self.shapes[self.genes[index]]
+        gene = self.genes[index]
+        if self.orientations is None:
+            return self.shapes[gene]
+
+        # Only the chosen orientation is placed.
+        return [self.shapes[gene][self.orientations[gene]]]
 
     def __len__(self):
         return len(self.shapes)
 
     def __str__(self):
+        if self.orientations is not None:
+            return ("Chromosome genes {}, orientations {}, "
+                    "Fitness: {:.20f}").format(self.genes, self.orientations,
+                                               self.fitness)
+
         return "Chromosome genes {}, Fitness: {:.20f}".format(self.genes,
             self.fitness)
 
     def __repr__(self):
         return str(self)
+
+
+def shape_outline(shape):
+    """The id and the primitives of the shape, relative to its bounding box.
+    The shapes with the same outline are placed the same.
+    """
+
+    bounding_box = shape.bounding_box
+    left, bottom = bounding_box.left, bounding_box.bottom
+    values = [shape.id]
+    for primitive in shape.primitive_iterator():
+        values.extend(round(value, 6) for value in (
+            primitive.x1 - left, primitive.y1 - bottom,
+            primitive.x2 - left, primitive.y2 - bottom))
+
+    return tuple(values)
+
+def shape_classes(shapes):
+    """Finds the copies of each shape (the Quantity of the profile), they
+    have the same id and are interchangeable. The copies with their
+    primitives in other order may be placed elsewhere, they are apart.
+
+    Parameters:
+        shapes a list of lists of orientations, the shapes of blf_data.
+    Return:
+        A list with the index of the first copy of the shape of each gene.
+    """
+
+    first = {}
+    return [first.setdefault(shape_outline(orientations[0]), i)
+            for i, orientations in enumerate(shapes)]
+
+def canonical_key(key, classes):
+    """Puts the copies of each shape on the key in the order of their indices.
+    The chromosomes that only swap copies of a shape have the same layout
+    and the same canonical key, which is the key of one of them.
+
+    Parameters:
+        key a key of a BLFChromosome.
+        classes the list returned by shape_classes.
+    Return:
+        A key.
+    """
+
+    chromosome = BLFChromosome.from_key(key)
+    genes = chromosome.genes
+
+    # The genes are a permutation of the indices of the shapes.
+    copies = {}
+    for gene in xrange(len(genes)):
+        copies.setdefault(classes[gene], []).append(gene)
+    for indices in copies.itervalues():
+        indices.reverse()
+
+    canonical = BLFChromosome()
+    canonical.genes = [copies[classes[gene]].pop() for gene in genes]
+    if chromosome.orientations is not None:
+        orientations = list(chromosome.orientations)
+        for gene, canonical_gene in itertools.izip(genes, canonical.genes):
+            orientations[canonical_gene] = chromosome.orientations[gene]
+        canonical.orientations = orientations
+
+    return canonical.key()
@@ -20,6 +20,7 @@
 import ippl.shape
 import ippl.bottom_left_fill
 import ippl.genetic_algorithm
+import ippl.nfp
 import ippl.reader
 import ippl.render
 import ippl.util
@@ -17,5 +17,9 @@
 # along with ippl.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+from ippl.bottom_left_fill.spatial_index import *
+from ippl.bottom_left_fill.skyline import *
 from ippl.bottom_left_fill.sheet_shape import *
+from ippl.bottom_left_fill.checkpoint import *
+from ippl.bottom_left_fill.parallel import *
 from ippl.bottom_left_fill.algorithm import *
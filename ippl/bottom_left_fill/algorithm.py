@@ -17,9 +17,11 @@
 # along with ippl.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import bisect
 import copy
 
 from ippl.bottom_left_fill.sheet_shape import *
+from ippl.bottom_left_fill.parallel import OrientationPool
 from ippl.shape import *
 from ippl.render import *
 
@@ -28,6 +30,14 @@ class BottomLeftFill(object):
 
     FREE_PRIMITIVE = 0
     STATIC_PRIMITIVE = 1
+    # The vectorized tests are used from this number of segment pairs
+    # between a shape and its neighbours. A kernel call costs about 150us,
+    # the scalar tests on the BVH are faster up to about 64x64 pairs of
+    # touching shapes and slower from 128x128.
+    KERNEL_PAIRS = 8192
+    # The tolerance of the vertical clearances on the crossing of two
+    # primitives.
+    EPSILON = 1e-09
 
     def __init__(self):
         super(BottomLeftFill, self).__init__()
@@ -35,17 +45,112 @@ class BottomLeftFill(object):
         self.shapes = []
         self.sheetshape = RectangularSheetShape()
         self.resolution = Point(25, 1)
+        self.spatial_index = True
+        self.vectorized = False
+        self.analytical = False
+        self.skyline = False
+        self.jobs = 1
+        self.checkpoints = []
+        # The run stops when the sheetshape gets wider than the bound.
+        self.bound = None
+        self.pruned = False
 
     @staticmethod
-    def next_move(shape, static_shape):
-        for primitive in shape.primitive_iterator():
-            for static_primitive in static_shape.primitive_iterator():
+    def next_move(shape, static_shape, vectorized=False):
+        if (vectorized and shape.segments is not None and
+                static_shape.segments is not None):
+            return BottomLeftFill.next_move_vectorized(shape, static_shape)
+
+        if shape.bvh and static_shape.bvh:
+            # Only the primitives tested are moved to where the shapes are.
+            pairs = shape.bvh.intersect_pairs(static_shape.bvh)
+            for primitive, static_primitive in pairs:
+                primitive = shape.translated(primitive)
+                static_primitive = static_shape.translated(static_primitive)
                 if BottomLeftFill.intersect_primitives(primitive,
                         static_primitive):
                     return (primitive, static_primitive)
+        else:
+            for primitive in shape.primitive_iterator():
+                for static_primitive in static_shape.primitive_iterator():
+                    if BottomLeftFill.intersect_primitives(primitive,
+                            static_primitive):
+                        return (primitive, static_primitive)
+
+        for point in shape.outer_points():
+            if static_shape.contains_point(point):
+                return shape.next_lowest_y_move(static_shape)
+
+        return None
+
+    @staticmethod
+    def next_move_vectorized(shape, static_shape):
+        """Same as next_move, testing all the primitive pairs at once with the
+        segment arrays of the shapes.
+        """
+
+        segments = shape.segments
+        static_segments = static_shape.segments
+        pair = kernels.intersect_segments(segments, static_segments, True)
+        if pair:
+            return (shape.primitive(pair[0]), static_shape.primitive(pair[1]))
+
+        points = segments[:shape.outer_loop_size(), 0:2]
+        return BottomLeftFill.contained_move(shape, points, static_shape,
+                                             static_segments)
+
+    @staticmethod
+    def next_move_batch(shape, segments, static_shapes, static_segments):
+        """Same as next_move_vectorized on each static shape in order, the
+        segments of the shape are tested against the segments of all the
+        static shapes in one call. The static shapes before the first one
+        intersecting are only tested for containment.
+
+        Parameters:
+            shape a Shape object.
+            segments the segment array of the shape.
+            static_shapes a list of Shape objects.
+            static_segments a list with the segment array of each static
+                shape.
+        Return:
+            The result of next_move for the first static shape overlapping,
+            or None.
+        """
+
+        hit = kernels.intersect_first(segments, static_segments)
+        first = hit[0] if hit else len(static_shapes)
+
+        points = segments[:shape.outer_loop_size(), 0:2]
+        for k in xrange(first):
+            result = BottomLeftFill.contained_move(shape, points,
+                static_shapes[k], static_segments[k])
+            if result:
+                return result
+
+        if hit:
+            k, i, j = hit
+            return (shape.primitive(i), static_shapes[k].primitive(j))
+
+        return None
 
-        for primitive in shape.outer_loop_iterator():
-            if static_shape.contains_point(primitive.begin):
+    @staticmethod
+    def contained_move(shape, points, static_shape, static_segments):
+        """Checks the outer points of the shape, given as a (K, 2) array,
+        against the segment array of the static shape.
+
+        Return:
+            The next_lowest_y_move if a point is inside the static shape,
+            and None otherwise.
+        """
+
+        bounding_box = static_shape.bounding_box
+        inside = ((points[:, 0] >= bounding_box.left) &
+                  (points[:, 0] <= bounding_box.right) &
+                  (points[:, 1] >= bounding_box.bottom) &
+                  (points[:, 1] <= bounding_box.top))
+        if inside.any():
+            points = points[inside]
+            if kernels.contains_points(static_segments, points).any():
                 return shape.next_lowest_y_move(static_shape)
 
         return None
@@ -123,79 +228,430 @@ class BottomLeftFill(object):
 
         return False
 
-    def run(self):
+    def run(self, checkpoints=None):
+        """Places the shapes on the sheetshape.
+
+        Parameters:
+            checkpoints a list of checkpoints of a previous run, its first
+                shapes are restored instead of placed again. They must be
+                the same (and in the same order) of the first shapes here.
+        Return:
+            The bounding box of the sheetshape. When pruned is set, the
+            sheetshape got wider than the bound and has only the first
+            shapes.
+        """
+
         best_orientation = 0
         position_data = {}
         origin = Point(0, 0)
+        self.checkpoints = []
+        self.pruned = False
 
-        shape = self.shapes[0][0]
-        shape.position(origin.x, origin.y)
-        self.sheetshape.append(shape)
+        start = 0
+        if checkpoints:
+            start = self.restore(checkpoints, position_data)
+        else:
+            shape = self.shapes[0][0]
+            shape.position(origin.x, origin.y)
+            self.sheetshape.append(shape)
 
-        position = shape.bounding_box.left_bottom
-        key = "{}".format(shape.id)
-        position_data[key] = position
+            position = shape.bounding_box.left_bottom
+            key = "{}".format(shape.id)
+            position_data[key] = position
+            self.checkpoint(0, shape, position)
+            start = 1
 
-        for i in xrange(1, len(self.shapes)):
-            best_orientation = 0
-            orientations = self.shapes[i]
-            for j in xrange(len(orientations)):
-                shape = orientations[j]
+        pool = None
+        if self.jobs > 1 and start < len(self.shapes):
+            pool = OrientationPool(self, self.jobs)
 
-                key = "{}".format(shape.id)
+        # The workers are stopped also when the placement is interrupted.
+        try:
+            for i in xrange(start, len(self.shapes)):
+                if self.exceeds_bound():
+                    self.pruned = True
+                    break
+
+                best_orientation = 0
+                orientations = self.shapes[i]
+
+                key = "{}".format(orientations[0].id)
                 position = position_data.get(key)
                 if not position:
                     position = origin
 
-                shape.position(position.x, position.y)
+                if pool:
+                    placed = pool.slide(i, position)
+                else:
+                    placed = [self.slide(shape, position)
+                              for shape in orientations]
 
-                if self.sheetshape.out(shape):
-                    bounding_box = shape.bounding_box
-                    shape.position(bounding_box.left + self.resolution.x, 0)
-                    if self.sheetshape.out(shape):
-                        continue
+                for j in xrange(len(orientations)):
+                    if (placed[j] and
+                            self.check_best_orientation(orientations[j])):
+                        best_orientation = j
 
-                #print "Shape {}, Rotation {}\r".format(shape.id, j)
+                best_shape = orientations[best_orientation]
+                #print "Put {}/{} on sheetshape.".format(best_shape.id,
+                #    best_orientation)
+                self.sheetshape.append(best_shape)
+                if pool:
+                    pool.append(i, best_orientation)
 
-                while True:
-                    result = self.overlap_sheetshape(shape)
-                    if not result:
-                        break
+                shape = orientations[-1]
 
-                    self.resolve_overlapping(shape, result)
-                    if self.sheetshape.out(shape):
-                        bounding_box = shape.bounding_box
-                        shape.position(bounding_box.left + self.resolution.x, 0)
+                key = "{}".format(shape.id)
+                position = shape.bounding_box.left_bottom
+                position_data[key] = position
+                self.checkpoint(best_orientation, best_shape, position)
 
-                best_shape_orientation = orientations[best_orientation]
-                if self.check_best_orientation(shape):
-                    best_orientation = j
+                #print "Sheet Shape size:", len(self.sheetshape)
+        finally:
+            if pool:
+                pool.close()
 
-            best_shape = orientations[best_orientation]
-            #print "Put {}/{} on sheetshape.".format(best_shape.id,
-            #    best_orientation)
-            self.sheetshape.append(best_shape)
+        return self.sheetshape.bounding_box
 
-            key = "{}".format(shape.id)
-            position = shape.bounding_box.left_bottom
-            position_data[key] = position
+    def exceeds_bound(self):
+        """Checks whether the sheetshape is wider than the bound, the next
+        shapes can only make it wider.
+        """
 
-            #print "Sheet Shape size:", len(self.sheetshape)
+        return (self.bound is not None and
+                self.sheetshape.bounding_box.size()[0] > self.bound)
 
-        return self.sheetshape.bounding_box
+    def slide(self, shape, position):
+        """Slides the shape from the position, up and then to the next
+        columns, until it doesn't overlap the sheetshape.
+
+        Parameters:
+            shape a Shape object.
+            position a Point object, where the shape starts.
+        Return:
+            False if the shape doesn't fit on the sheet, and True otherwise.
+        """
+
+        shape.position(position.x, position.y)
+
+        if self.sheetshape.out(shape):
+            self.next_column(shape)
+            if self.sheetshape.out(shape):
+                return False
+
+        slide_up = self.jump_up if self.analytical else self.slide_up
+        while True:
+            if not slide_up(shape):
+                break
+
+            if self.sheetshape.out(shape):
+                self.next_column(shape)
+
+        return True
+
+    def next_column(self, shape):
+        """Moves the shape right by the resolution, to the bottom of the
+        sheet or, with the skyline, to the lowest free point of the
+        sheetshape under the shape: on the skyline or at the bottom of the
+        free space under overhanging shapes. Nothing fits below it.
+
+        Parameters:
+            shape a Shape object.
+        """
+
+        bounding_box = shape.bounding_box
+        x = bounding_box.left + self.resolution.x
+        y = 0
+        if self.skyline:
+            width, height = bounding_box.size()
+            y = self.sheetshape.skyline.floor(x, x + width, y)
+            # Never out of the sheet, the slide up finds if it fits.
+            y = max(min(y, self.sheetshape.rectangle.top - height), 0)
+
+        shape.position(x, y)
+
+    def checkpoint(self, orientation, shape, position):
+        """Records the placement of a shape: the orientation chosen, where
+        it was put and the position where the next shape with the same id
+        starts sliding.
+        """
+
+        bounding_box = shape.bounding_box
+        self.checkpoints.append((orientation, bounding_box.left,
+                                 bounding_box.bottom, position.x, position.y))
+
+    def restore(self, checkpoints, position_data):
+        """Puts the first shapes where the checkpoints say.
+
+        Parameters:
+            checkpoints a list of checkpoints.
+            position_data the dict of positions of run, updated here.
+        Return:
+            The number of shapes restored.
+        """
+
+        size = min(len(checkpoints), len(self.shapes))
+        for i in xrange(size):
+            orientation, x, y, position_x, position_y = checkpoints[i]
+            shape = self.shapes[i][orientation]
+            shape.position(x, y)
+            self.sheetshape.append(shape)
+
+            key = "{}".format(shape.id)
+            position_data[key] = Point(position_x, position_y)
+            self.checkpoints.append(checkpoints[i])
+
+        return size
 
     def overlap_sheetshape(self, shape):
         bounding_box = shape.bounding_box
 
-        for static_shape in self.sheetshape:
-            static_bounding_box = static_shape.bounding_box
-            if bounding_box.intersect_rectangle(static_bounding_box):
-                result = BottomLeftFill.next_move(shape, static_shape)
-                if result:
-                    return result
+        static_shapes = self.sheetshape
+        if self.spatial_index:
+            static_shapes = self.sheetshape.query(bounding_box)
+
+        static_shapes = [static_shape for static_shape in static_shapes
+                         if bounding_box.intersect_rectangle(
+                             static_shape.bounding_box)]
+
+        if not static_shapes:
+            return None
+
+        # With the kernels the shape is tested against all its neighbours
+        # at once, the segment arrays of moved shapes are created on access.
+        if self.vectorized and (shape.segment_count() *
+                sum(static_shape.segment_count()
+                    for static_shape in static_shapes) >= self.KERNEL_PAIRS):
+            segments = shape.segments
+            static_segments = [static_shape.segments
+                               for static_shape in static_shapes]
+            if segments is not None and not any(static is None
+                                                for static in static_segments):
+                return BottomLeftFill.next_move_batch(shape, segments,
+                    static_shapes, static_segments)
+
+        for static_shape in static_shapes:
+            result = BottomLeftFill.next_move(shape, static_shape)
+            if result:
+                return result
 
         return None
 
+    def slide_up(self, shape):
+        """Moves the shape up, out of the overlapping found on the sheetshape.
+
+        Parameters:
+            shape a Shape object.
+        Return:
+            True if the shape was overlapping and has been moved, and False
+            otherwise.
+        """
+
+        result = self.overlap_sheetshape(shape)
+        if not result:
+            return False
+
+        self.resolve_overlapping(shape, result)
+        return True
+
+    def jump_up(self, shape):
+        """Same as slide_up, but the moves up after the first one are
+        calculated from the vertical clearances of the primitives, without
+        testing the collisions, and the shape jumps to where the slide stops
+        in one move. The shape is put where slide_up would put it.
+
+        Parameters:
+            shape a Shape object.
+        Return:
+            True if the shape was overlapping and has been moved, and False
+            otherwise.
+        """
+
+        result = self.overlap_sheetshape(shape)
+        if not result:
+            return False
+
+        self.resolve_overlapping(shape, result)
+        if isinstance(result, tuple):
+            y_move = self.slide_move(shape)
+            if y_move:
+                shape.move(0, y_move)
+
+        return True
+
+    def slide_move(self, shape):
+        """Calculates how far slide_up moves the shape before it stops, goes
+        out of the sheet or gets to a move not calculated here.
+
+        The primitive pairs cross on an interval of vertical moves, see
+        vertical_clearance. Each step of slide_up takes the first crossing
+        pair, in the order of overlap_sheetshape, and moves the shape by the
+        distance to the end of its interval plus the resolution.
+
+        Parameters:
+            shape a Shape object.
+        Return:
+            The distance, the moves up of slide_up in one.
+        """
+
+        bounding_box = shape.bounding_box
+        left, bottom = bounding_box.left, bounding_box.bottom
+        right, top = bounding_box.right, bounding_box.top
+        sheet_top = self.sheetshape.rectangle.top
+
+        column = Rectangle(left, bottom, right, max(sheet_top, top))
+        static_shapes = self.sheetshape
+        if self.spatial_index:
+            static_shapes = self.sheetshape.query(column)
+        static_shapes = [static_shape for static_shape in static_shapes
+                         if column.intersect_rectangle(
+                             static_shape.bounding_box)]
+
+        segments = [(line.x1, line.y1, line.x2, line.y2)
+                    for line in (shape.translated(primitive)
+                                 for primitive in shape.primitive_iterator())]
+        points = [Point(point.x, point.y) for point in shape.outer_points()]
+        clearances = {}
+
+        y_move = 0.0
+        while top + y_move <= sheet_top:
+            step = None
+            for static_shape in static_shapes:
+                static_bounding_box = static_shape.bounding_box
+                if (static_bounding_box.bottom > top + y_move or
+                        static_bounding_box.top < bottom + y_move):
+                    continue
+
+                intervals = clearances.get(id(static_shape))
+                if intervals is None:
+                    intervals = self.clearances(segments, static_shape,
+                                                left, right)
+                    clearances[id(static_shape)] = intervals
+
+                for lowest, highest, exact in intervals:
+                    if (lowest - self.EPSILON <= y_move <=
+                            highest + self.EPSILON):
+                        if not exact:
+                            return y_move
+                        step = highest - y_move
+                        break
+                if step is not None:
+                    break
+
+                # Inside a static shape slide_up moves by other rules.
+                for point in points:
+                    if static_shape.contains_point(Point(point.x,
+                                                         point.y + y_move)):
+                        return y_move
+
+            if step is None:
+                break
+
+            # The same distances of resolve_line_line.
+            if almost_equal(step, 0.0):
+                step = self.resolution.y
+            elif step < 0:
+                step = 0
+            y_move += step + self.resolution.y
+
+        return y_move
+
+    @staticmethod
+    def clearances(segments, static_shape, left, right):
+        """Calculates the vertical clearances of the segments of a shape
+        with the primitives of a static shape, in the order of the tests of
+        next_move.
+
+        Parameters:
+            segments a list of (x1, y1, x2, y2) tuples.
+            static_shape a Shape object.
+            left a real number, the left of the shape.
+            right a real number, the right of the shape.
+        Return:
+            A list of (lowest, highest, exact) tuples, exact is False when
+            one of the primitives is vertical, resolve_line_line measures
+            those to the end of the collinear part.
+        """
+
+        # The static segments sorted by their left end, those with a
+        # common x range with a segment are found by bisection.
+        static_segments = []
+        for j, primitive in enumerate(static_shape.primitive_iterator()):
+            x1, x2 = primitive.x1, primitive.x2
+            if min(x1, x2) <= right and max(x1, x2) >= left:
+                static_segments.append((min(x1, x2), j, (x1, primitive.y1,
+                                                         x2, primitive.y2)))
+        if not static_segments:
+            return []
+        static_segments.sort()
+        lefts = [static_segment[0] for static_segment in static_segments]
+        width = max(abs(static_segment[2][2] - static_segment[2][0])
+                    for static_segment in static_segments)
+
+        pairs = []
+        for i, segment in enumerate(segments):
+            first = bisect.bisect_left(lefts, min(segment[0], segment[2]) -
+                                       width)
+            last = bisect.bisect_right(lefts, max(segment[0], segment[2]))
+            for static_left, j, static_segment in static_segments[first:last]:
+                interval = BottomLeftFill.vertical_clearance(segment,
+                                                             static_segment)
+                if interval:
+                    exact = (segment[0] != segment[2] and
+                             static_segment[0] != static_segment[2])
+                    pairs.append((i, j) + interval + (exact,))
+        pairs.sort()
+
+        return [pair[2:] for pair in pairs]
+
+    @staticmethod
+    def vertical_clearance(segment, static_segment):
+        """Calculates the vertical moves of a segment where it touches or
+        crosses a static segment. They are the distances of the vertical
+        rays from the vertices of each one to the other, at the ends of
+        their common x range, as the PIRs of resolve_line_line.
+
+        Parameters:
+            segment a (x1, y1, x2, y2) tuple.
+            static_segment a (x1, y1, x2, y2) tuple.
+        Return:
+            A (lowest, highest) tuple of moves, or None when the segments
+            don't have a common x range.
+        """
+
+        x1, y1, x2, y2 = segment
+        static_x1, static_y1, static_x2, static_y2 = static_segment
+
+        if x1 < x2:
+            minimum_x, maximum_x = x1, x2
+        else:
+            minimum_x, maximum_x = x2, x1
+        if static_x1 < static_x2:
+            left, right = max(minimum_x, static_x1), min(maximum_x, static_x2)
+        else:
+            left, right = max(minimum_x, static_x2), min(maximum_x, static_x1)
+        if right < left:
+            return None
+
+        vertical = x1 == x2
+        static_vertical = static_x1 == static_x2
+        if vertical and static_vertical:
+            distances = (static_y1 - y1, static_y1 - y2,
+                         static_y2 - y1, static_y2 - y2)
+        elif vertical:
+            y = static_y1 + (static_y2 - static_y1) * ((x1 - static_x1) /
+                                                       (static_x2 - static_x1))
+            distances = (y - y1, y - y2)
+        elif static_vertical:
+            y = y1 + (y2 - y1) * (static_x1 - x1) / (x2 - x1)
+            distances = (static_y1 - y, static_y2 - y)
+        else:
+            slope = (y2 - y1) / (x2 - x1)
+            static_slope = (static_y2 - static_y1) / (static_x2 - static_x1)
+            distances = [static_y1 + static_slope * (x - static_x1) -
+                         (y1 + slope * (x - x1)) for x in (left, right)]
+
+        return min(distances), max(distances)
+
     def resolve_overlapping(self, shape, data):
         if isinstance(data, float):
             if data < 0:
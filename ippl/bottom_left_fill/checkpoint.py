@@ -0,0 +1,117 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import collections
+import itertools
+
+
+class CheckpointStore(object):
+
+    def __init__(self, capacity=256):
+        """Creates a CheckpointStore object.
+
+        Keeps the checkpoints of the last runs of BottomLeftFill, keyed by the
+        sequence of shapes placed (the genes of the chromosomes), so a run
+        can restore the longest prefix it shares with a previous one.
+
+        Parameters:
+            capacity a integer, the max number of runs kept.
+        """
+
+        super(CheckpointStore, self).__init__()
+
+        self.capacity = capacity
+        self.signature = None
+
+        self.hits = 0
+        self.misses = 0
+        self.restored = 0
+
+        self._runs = collections.OrderedDict()
+
+    def bind(self, signature):
+        """Clears the store when the signature (of the profile and of the
+        parameters of the runs) changes.
+        """
+
+        if signature != self.signature:
+            self.clear()
+            self.signature = signature
+
+    def get(self, sequence):
+        """Finds the checkpoints of the longest prefix of the sequence
+        already placed.
+
+        Parameters:
+            sequence a tuple.
+        Return:
+            A list of checkpoints, empty if no run starts like the sequence.
+        """
+
+        best_key = None
+        best_size = 0
+        for key in self._runs:
+            size = 0
+            for a, b in itertools.izip(key, sequence):
+                if a != b:
+                    break
+                size += 1
+
+            if size > best_size:
+                best_key, best_size = key, size
+                if size == len(sequence):
+                    break
+
+        if not best_size:
+            self.misses += 1
+            return []
+
+        checkpoints = self._runs.pop(best_key)
+        self._runs[best_key] = checkpoints
+        self.hits += 1
+        self.restored += best_size
+
+        return checkpoints[:best_size]
+
+    def put(self, sequence, checkpoints):
+        if not self.capacity:
+            return
+
+        self._runs.pop(sequence, None)
+        self._runs[sequence] = checkpoints
+        while len(self._runs) > self.capacity:
+            self._runs.popitem(last=False)
+
+    def clear(self):
+        self._runs.clear()
+        self.hits = 0
+        self.misses = 0
+        self.restored = 0
+
+    def __len__(self):
+        return len(self._runs)
+
+    def __str__(self):
+        return ("Checkpoints: {} runs, {} hits, {} misses, {} placements "
+                "restored").format(len(self), self.hits, self.misses,
+                                   self.restored)
+
+
+# One store per process, it lasts across the fitness calculations.
+checkpoint_store = CheckpointStore()
@@ -0,0 +1,216 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from multiprocessing import Pipe
+from multiprocessing import Process
+
+from ippl.shape.point import Point
+
+
+class OrientationWorker(Process):
+
+    def __init__(self, blf, connection):
+        """Creates a OrientationWorker object.
+
+        The worker keeps its own copy of the BottomLeftFill (made by the
+        fork), slides the orientations it is given on it and appends the
+        shapes placed by the main process.
+
+        Parameters:
+            blf a BottomLeftFill object.
+            connection a Connection object.
+        """
+
+        super(OrientationWorker, self).__init__()
+
+        self.blf = blf
+        self.connection = connection
+        self.daemon = True
+        self.start()
+
+    def run(self):
+        blf = self.blf
+        while True:
+            message = self.connection.recv()
+            command = message[0]
+
+            if command == "slide":
+                _, i, orientations, x, y = message
+                try:
+                    results = []
+                    for j in orientations:
+                        shape = blf.shapes[i][j]
+                        placed = blf.slide(shape, Point(x, y))
+                        bounding_box = shape.bounding_box
+                        results.append((j, bounding_box.left,
+                                        bounding_box.bottom, placed))
+                except Exception, e:
+                    results = e
+                self.connection.send(results)
+            elif command == "append":
+                _, i, j, x, y = message
+                shape = blf.shapes[i][j]
+                shape.position(x, y)
+                blf.sheetshape.append(shape)
+            else:
+                break
+
+
+class OrientationPool(object):
+
+    # The seconds between the checks of a worker not answering yet.
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, blf, jobs):
+        """Creates a OrientationPool object.
+
+        Slides the orientations of a shape at the same time, each worker on
+        its own copy of the sheetshape. The workers are forked here, so they
+        start with the shapes already placed by blf.
+
+        A worker that dies isn't used anymore, its orientations are slid by
+        this process.
+
+        Parameters:
+            blf a BottomLeftFill object.
+            jobs a integer, the number of workers.
+        """
+
+        super(OrientationPool, self).__init__()
+
+        self.blf = blf
+        self.connections = []
+        self.workers = []
+
+        for _ in xrange(jobs):
+            connection, worker_connection = Pipe()
+            self.workers.append(OrientationWorker(blf, worker_connection))
+            self.connections.append(connection)
+            # Only the worker has its end, the pipe is closed when it dies.
+            worker_connection.close()
+
+    def slide(self, i, position):
+        """Slides every orientation of the shape i from the position, the
+        orientations are left where the workers left them.
+
+        Parameters:
+            i a integer, the index of the shape on blf.shapes.
+            position a Point object.
+        Return:
+            A list with a bool value for each orientation, False if it
+            doesn't fit on the sheet.
+        """
+
+        orientations = self.blf.shapes[i]
+        size = len(orientations)
+        jobs = min(size, len(self.connections))
+        if not jobs:
+            return [self.blf.slide(shape, position) for shape in orientations]
+
+        lost = []
+        for k in xrange(jobs):
+            try:
+                self.connections[k].send(("slide", i, range(k, size, jobs),
+                                          position.x, position.y))
+            except IOError:
+                lost.append(k)
+
+        placed = [False] * size
+        for k in xrange(jobs):
+            results = None
+            if k not in lost:
+                results = self._receive(k)
+            if results is None:
+                if k not in lost:
+                    lost.append(k)
+                for j in xrange(k, size, jobs):
+                    placed[j] = self.blf.slide(orientations[j], position)
+                continue
+            if isinstance(results, Exception):
+                raise results
+
+            for j, x, y, fits in results:
+                orientations[j].position(x, y)
+                placed[j] = fits
+
+        self._remove(lost)
+
+        return placed
+
+    def _receive(self, k):
+        """Waits for the results of the worker k.
+
+        Return:
+            The results, or None if the worker is gone.
+        """
+
+        connection = self.connections[k]
+        worker = self.workers[k]
+        try:
+            while not connection.poll(self.POLL_INTERVAL):
+                if not worker.is_alive():
+                    return None
+            return connection.recv()
+        except (EOFError, IOError):
+            return None
+
+    def _remove(self, lost):
+        """Stops using the workers at the indices."""
+
+        for k in sorted(lost, reverse=True):
+            self.connections.pop(k).close()
+            worker = self.workers.pop(k)
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+    def append(self, i, j):
+        """Appends the orientation j of the shape i, where it is now, to the
+        sheetshapes of the workers.
+        """
+
+        bounding_box = self.blf.shapes[i][j].bounding_box
+        lost = []
+        for k in xrange(len(self.connections)):
+            try:
+                self.connections[k].send(("append", i, j, bounding_box.left,
+                                          bounding_box.bottom))
+            except IOError:
+                lost.append(k)
+        self._remove(lost)
+
+    def close(self):
+        """Stops the workers. A worker still sliding, when the placement was
+        interrupted, is terminated.
+        """
+
+        for connection in self.connections:
+            try:
+                connection.send(("close",))
+            except IOError:
+                pass
+            connection.close()
+        self.connections = []
+
+        for worker in self.workers:
+            worker.join(1)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        self.workers = []
@@ -18,6 +18,8 @@
 #
 
 from ippl.shape.rectangle import Rectangle
+from ippl.bottom_left_fill.spatial_index import GridIndex
+from ippl.bottom_left_fill.skyline import Skyline
 
 
 class SheetShape(list):
@@ -25,6 +27,9 @@ class SheetShape(list):
     def out(self, shape):
         pass
 
+    def query(self, bounding_box):
+        return self
+
 
 class RectangularSheetShape(SheetShape):
 
@@ -33,9 +38,19 @@ class RectangularSheetShape(SheetShape):
 
         self.rectangle = Rectangle()
         self.bounding_box = None
+        self.index = GridIndex()
+        self.skyline = Skyline()
+
+        for o in self:
+            self.index.insert(o, o.bounding_box)
+            self.skyline.append(o)
 
     def append(self, o):
+        # The shapes on the sheet don't move anymore.
+        o.apply_offset()
         list.append(self, o)
+        self.index.insert(o, o.bounding_box)
+        self.skyline.append(o)
 
         if self.bounding_box:
             bbox = o.bounding_box
@@ -52,6 +67,17 @@ class RectangularSheetShape(SheetShape):
             self.bounding_box = Rectangle(bbox.left, bbox.bottom,
                 bbox.right, bbox.top)
 
+    def query(self, bounding_box):
+        """Finds the shapes that may overlap the bounding box.
+
+        Parameters:
+            bounding_box a Rectangle object.
+        Return:
+            A list of shapes, in the order they were appended.
+        """
+
+        return self.index.query(bounding_box)
+
     def out(self, shape):
         bounding_box = shape.bounding_box
         return bounding_box.top > self.rectangle.top
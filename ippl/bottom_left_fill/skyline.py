@@ -0,0 +1,326 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import bisect
+
+
+class Skyline(object):
+
+    def __init__(self, epsilon=1e-06):
+        """Creates a Skyline object.
+
+        The upper envelope of the outer loops of the shapes, as a sorted list
+        of non-overlapping (x1, y1, x2, y2) pieces with x1 < x2. Between the
+        pieces there is nothing.
+
+        The shapes appended are merged on the next query, so keeping a
+        skyline costs nothing until it is used.
+
+        It also keeps the overhangs, the free space there may be under the
+        skyline: under the bottom edges of a shape higher than the skyline
+        was before it, and in the holes of the shapes. They are a sorted
+        list of non-overlapping (x1, x2, y) steps, y is the lowest bottom of
+        the free space on [x1, x2].
+
+        Parameters:
+            epsilon a real number, the shortest piece kept.
+        """
+
+        super(Skyline, self).__init__()
+
+        self.epsilon = epsilon
+        self.pieces = []
+        self.overhangs = []
+
+        self._starts = []
+        self._ends = []
+        self._overhang_starts = []
+        self._overhang_ends = []
+        self._pending = []
+
+    def append(self, shape):
+        self._pending.append(shape)
+
+    def _flush(self):
+        for shape in self._pending:
+            outer_loop = shape.outer_loop
+            # The bottom edges go right on a counterclockwise loop.
+            area = sum(primitive.x1 * primitive.y2 - primitive.x2 * primitive.y1
+                       for primitive in outer_loop)
+            edges = [(primitive.x1, primitive.y1, primitive.x2, primitive.y2)
+                     for primitive in outer_loop]
+            tops = [edge for edge in edges if (edge[2] - edge[0]) * area < 0]
+            for edge in edges:
+                if ((edge[2] - edge[0]) * area > 0 and
+                        self.clearance(*edge) > self.epsilon):
+                    self.mark(edge[0], edge[2], self._bottom(edge, tops))
+
+            for loop in shape.inner_loops:
+                if loop:
+                    xs = [primitive.x1 for primitive in loop]
+                    ys = [primitive.y1 for primitive in loop]
+                    self.mark(min(xs), max(xs), min(ys))
+
+            for primitive in outer_loop:
+                self.insert(primitive.x1, primitive.y1,
+                            primitive.x2, primitive.y2)
+        self._pending = []
+
+    def _bottom(self, edge, tops):
+        """Calculates a lower bound of the bottom of the free space under
+        the bottom edge of a shape, on the skyline or on the top edges of
+        the shape under the edge.
+        """
+
+        x1, y1, x2, y2 = edge
+        if x1 > x2:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+
+        below = Skyline(self.epsilon)
+        for top in tops:
+            left = max(min(top[0], top[2]), x1)
+            right = min(max(top[0], top[2]), x2)
+            if right - left < self.epsilon:
+                continue
+            # The edges of a shape don't cross, one is under the other.
+            middle = (left + right) / 2.0
+            if self._value(top, middle) < self._value(edge, middle):
+                below.insert(left, self._value(top, left),
+                             right, self._value(top, right))
+
+        return max(self._height(x1, x2),
+                   below._height(x1, x2, float("-inf")))
+
+    @staticmethod
+    def _value(piece, x):
+        x1, y1, x2, y2 = piece
+        return y1 + (y2 - y1) * (x - x1) / (x2 - x1)
+
+    def _clip(self, piece, left, right):
+        if right - left < self.epsilon:
+            return []
+        return [(left, self._value(piece, left),
+                 right, self._value(piece, right))]
+
+    def _upper(self, piece, other, left, right):
+        """Calculates the upper envelope of two pieces on [left, right]."""
+
+        if right - left < self.epsilon:
+            return []
+
+        difference_left = (self._value(piece, left) -
+                           self._value(other, left))
+        difference_right = (self._value(piece, right) -
+                            self._value(other, right))
+        if difference_left >= 0 and difference_right >= 0:
+            return self._clip(piece, left, right)
+        if difference_left <= 0 and difference_right <= 0:
+            return self._clip(other, left, right)
+
+        # The pieces cross once inside the interval.
+        x = left + (right - left) * (difference_left /
+                                     (difference_left - difference_right))
+        if difference_left > 0:
+            return self._clip(piece, left, x) + self._clip(other, x, right)
+        return self._clip(other, left, x) + self._clip(piece, x, right)
+
+    def insert(self, x1, y1, x2, y2):
+        """Raises the skyline to the segment where it is below it.
+
+        Parameters:
+            x1 a real number.
+            y1 a real number.
+            x2 a real number.
+            y2 a real number.
+        """
+
+        if x1 > x2:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        if x2 - x1 < self.epsilon:
+            return
+
+        segment = (x1, y1, x2, y2)
+        first = bisect.bisect_right(self._ends, x1)
+        last = bisect.bisect_left(self._starts, x2)
+
+        pieces = []
+        cursor = x1
+        for piece in self.pieces[first:last]:
+            left = max(piece[0], x1)
+            right = min(piece[2], x2)
+            pieces.extend(self._clip(piece, piece[0], left))
+            pieces.extend(self._clip(segment, cursor, left))
+            pieces.extend(self._upper(piece, segment, left, right))
+            pieces.extend(self._clip(piece, right, piece[2]))
+            cursor = right
+        pieces.extend(self._clip(segment, cursor, x2))
+
+        self.pieces[first:last] = pieces
+        self._starts[first:last] = [piece[0] for piece in pieces]
+        self._ends[first:last] = [piece[2] for piece in pieces]
+
+    def clearance(self, x1, y1, x2, y2, default=0):
+        """Calculates the highest distance from a segment down to the
+        skyline, where there is nothing the skyline is at default.
+
+        Parameters:
+            x1 a real number.
+            y1 a real number.
+            x2 a real number.
+            y2 a real number.
+            default a real number, the height where there is nothing.
+        Return:
+            The highest distance, negative when the segment is under the
+            skyline.
+        """
+
+        if x1 > x2:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        if x2 - x1 < self.epsilon:
+            return max(y1, y2) - default
+
+        segment = (x1, y1, x2, y2)
+        first = bisect.bisect_right(self._ends, x1)
+        last = bisect.bisect_left(self._starts, x2)
+
+        # Both are linear between the ends of the pieces, the distance is
+        # the highest at one of them.
+        clearance = float("-inf")
+        cursor = x1
+        for piece in self.pieces[first:last]:
+            left = max(piece[0], x1)
+            right = min(piece[2], x2)
+            if left - cursor > self.epsilon:
+                clearance = max(clearance, self._value(segment, cursor) - default,
+                                self._value(segment, left) - default)
+            clearance = max(clearance,
+                            self._value(segment, left) - self._value(piece, left),
+                            self._value(segment, right) - self._value(piece, right))
+            cursor = right
+        if x2 - cursor > self.epsilon:
+            clearance = max(clearance, self._value(segment, cursor) - default,
+                            y2 - default)
+
+        return clearance
+
+    def mark(self, left, right, y):
+        """Adds free space from y up on [left, right] to the overhangs.
+
+        Parameters:
+            left a real number.
+            right a real number.
+            y a real number, the bottom of the free space.
+        """
+
+        if left > right:
+            left, right = right, left
+        if right - left < self.epsilon:
+            return
+
+        first = bisect.bisect_right(self._overhang_ends, left)
+        last = bisect.bisect_left(self._overhang_starts, right)
+
+        steps = []
+        cursor = left
+        for x1, x2, height in self.overhangs[first:last]:
+            steps.append((x1, left, height))
+            steps.append((cursor, x1, y))
+            steps.append((max(x1, left), min(x2, right), min(height, y)))
+            steps.append((right, x2, height))
+            cursor = min(x2, right)
+        steps.append((cursor, right, y))
+        steps = [step for step in steps if step[1] - step[0] > 0]
+
+        self.overhangs[first:last] = steps
+        self._overhang_starts[first:last] = [step[0] for step in steps]
+        self._overhang_ends[first:last] = [step[1] for step in steps]
+
+    def floor(self, left, right, default=0):
+        """Calculates the lowest point of the free space on [left, right],
+        the lowest point of the skyline or of the overhangs. Nothing can be
+        put lower than it.
+
+        Parameters:
+            left a real number.
+            right a real number.
+            default a real number, the height where there is nothing.
+        Return:
+            The lowest height.
+        """
+
+        self._flush()
+
+        floor = self._height(left, right, default)
+        first = bisect.bisect_right(self._overhang_ends, left)
+        last = bisect.bisect_left(self._overhang_starts, right)
+        for x1, x2, y in self.overhangs[first:last]:
+            floor = min(floor, y)
+
+        return floor
+
+    def height(self, left, right, default=0):
+        """Calculates the lowest point of the skyline on [left, right].
+
+        Parameters:
+            left a real number.
+            right a real number.
+            default a real number, the height where there is nothing.
+        Return:
+            The lowest height, or default when some part of the interval is
+            not covered.
+        """
+
+        self._flush()
+        return self._height(left, right, default)
+
+    def _height(self, left, right, default=0):
+        first = bisect.bisect_right(self._ends, left)
+        last = bisect.bisect_left(self._starts, right)
+        if first >= last:
+            return default
+
+        height = None
+        cursor = left
+        for piece in self.pieces[first:last]:
+            if piece[0] - cursor > self.epsilon:
+                return default
+
+            lowest = min(self._value(piece, max(piece[0], left)),
+                         self._value(piece, min(piece[2], right)))
+            if height is None or lowest < height:
+                height = lowest
+            cursor = piece[2]
+
+        if right - cursor > self.epsilon:
+            return default
+
+        return height
+
+    def clear(self):
+        self.pieces = []
+        self.overhangs = []
+        self._starts = []
+        self._ends = []
+        self._overhang_starts = []
+        self._overhang_ends = []
+        self._pending = []
+
+    def __len__(self):
+        self._flush()
+        return len(self.pieces)
@@ -0,0 +1,121 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import math
+
+
+class GridIndex(object):
+
+    def __init__(self, cell_size=None):
+        """Creates a GridIndex object.
+
+        A uniform grid of square cells, each cell holding the indices of the
+        items whose bounding box touches it.
+
+        Parameters:
+            cell_size a real number, or None to use the largest side of the
+                first inserted bounding box.
+        """
+
+        super(GridIndex, self).__init__()
+
+        self.cell_size = cell_size
+
+        self._cells = {}
+        self._items = []
+
+    def _cell_range(self, bounding_box):
+        size = self.cell_size
+        return (int(math.floor(bounding_box.left / size)),
+                int(math.floor(bounding_box.bottom / size)),
+                int(math.floor(bounding_box.right / size)),
+                int(math.floor(bounding_box.top / size)))
+
+    def insert(self, item, bounding_box):
+        """Inserts an item on every cell touched by its bounding box.
+
+        Parameters:
+            item any object.
+            bounding_box a Rectangle object.
+        """
+
+        if not self.cell_size:
+            self.cell_size = float(max(max(bounding_box.size()), 1.0))
+
+        index = len(self._items)
+        self._items.append(item)
+
+        left, bottom, right, top = self._cell_range(bounding_box)
+        for i in xrange(left, right + 1):
+            for j in xrange(bottom, top + 1):
+                self._cells.setdefault((i, j), []).append(index)
+
+    def query(self, bounding_box):
+        """Finds the items whose cells are touched by the bounding box.
+
+        Parameters:
+            bounding_box a Rectangle object.
+        Return:
+            A list of candidate items, in the order they were inserted.
+        """
+
+        if not self._items:
+            return []
+
+        indices = set()
+        cells = self._cells
+
+        left, bottom, right, top = self._cell_range(bounding_box)
+        for i in xrange(left, right + 1):
+            for j in xrange(bottom, top + 1):
+                cell = cells.get((i, j))
+                if cell:
+                    indices.update(cell)
+
+        items = self._items
+        return [items[index] for index in sorted(indices)]
+
+    def query_point(self, x, y):
+        """Finds the items whose cells contain the point.
+
+        Parameters:
+            x a real number.
+            y a real number.
+        Return:
+            A list of candidate items, in the order they were inserted.
+        """
+
+        if not self._items:
+            return []
+
+        size = self.cell_size
+        cell = self._cells.get((int(math.floor(x / size)),
+                                int(math.floor(y / size))))
+        if not cell:
+            return []
+
+        items = self._items
+        return [items[index] for index in cell]
+
+    def clear(self):
+        self._cells = {}
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
@@ -17,6 +17,9 @@
 # along with ippl.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import itertools
+import random
+
 def split(parents, pivot):
     """Create a new child using the parents genetics. Don't bothering the gene
     order.
@@ -43,20 +46,155 @@ def cycle(parents):
 
     p1, p2 = parents
     gene_number = len(p1)
-    offspring = [None for gene in range(gene_number)]
+    position = positions(p1)
+    offspring = list(p2)
 
+    # The first cycle comes from p1, the other genes from p2.
     i = 0
-    ciclic = False
-    while not ciclic:
+    in_cycle = [False] * gene_number
+    while not in_cycle[i]:
+        in_cycle[i] = True
         offspring[i] = p1[i]
+        i = position[p2[i]]
+
+    return offspring
+
+def partially_mapped(parents):
+    """Create a new child with a random slice of the first parent, the other
+    genes are from the second parent, mapped through the slice when they
+    are already on it (PMX). Keeping gene unicity.
+
+    Parameters:
+        parents: two gene list [[g1, g2, g3, ..., gn], [g1, g2, g3, ..., gn]]
+    Return:
+        A gene list to the new child.
+    """
+
+    p1, p2 = parents
+    begin, end = cut_points(len(p1))
+    position = positions(p1)
+    offspring = list(p2)
+    offspring[begin:end] = p1[begin:end]
+
+    in_slice = set(p1[begin:end])
+    for i in itertools.chain(xrange(begin), xrange(end, len(p1))):
         gene = p2[i]
-        i = p1.index(gene)
+        while gene in in_slice:
+            gene = p2[position[gene]]
+        offspring[i] = gene
+
+    return offspring
 
-        if p1[i] in offspring:
-            ciclic = True
+def order(parents):
+    """Create a new child with a random slice of the first parent, the other
+    genes are from the second parent in their order, starting after the
+    slice (OX1). Keeping gene unicity.
 
-    for i in xrange(gene_number):
-        if offspring[i] == None:
-            offspring[i] = p2[i]
+    Parameters:
+        parents: two gene list [[g1, g2, g3, ..., gn], [g1, g2, g3, ..., gn]]
+    Return:
+        A gene list to the new child.
+    """
+
+    p1, p2 = parents
+    gene_number = len(p1)
+    begin, end = cut_points(gene_number)
+    offspring = list(p1)
+
+    in_slice = set(p1[begin:end])
+    i = end % gene_number
+    for j in xrange(end, end + gene_number):
+        gene = p2[j % gene_number]
+        if gene not in in_slice:
+            offspring[i] = gene
+            i = (i + 1) % gene_number
 
     return offspring
+
+def edge_recombination(parents):
+    """Create a new child keeping the neighbours the genes have on the
+    parents. Each next gene is the neighbour of the last one with the fewest
+    neighbours left, or a random gene when it has none. Keeping gene
+    unicity.
+
+    Parameters:
+        parents: two gene list [[g1, g2, g3, ..., gn], [g1, g2, g3, ..., gn]]
+    Return:
+        A gene list to the new child.
+    """
+
+    p1, p2 = parents
+    gene_number = len(p1)
+
+    neighbours = {}
+    for parent in (p1, p2):
+        for i in xrange(gene_number):
+            edges = neighbours.setdefault(parent[i], set())
+            edges.add(parent[i - 1])
+            edges.add(parent[(i + 1) % gene_number])
+    for gene, edges in neighbours.iteritems():
+        edges.discard(gene)
+
+    # The genes left, removed by swapping with the last one.
+    left = list(p1)
+    index = positions(left)
+
+    offspring = []
+    gene = p1[0]
+    while True:
+        offspring.append(gene)
+
+        i = index.pop(gene)
+        last = left.pop()
+        if last != gene:
+            left[i] = last
+            index[last] = i
+        if not left:
+            break
+
+        edges = neighbours.pop(gene)
+        for neighbour in edges:
+            neighbours[neighbour].discard(gene)
+
+        if edges:
+            fewest = min(len(neighbours[neighbour]) for neighbour in edges)
+            gene = random.choice([neighbour for neighbour in edges
+                                  if len(neighbours[neighbour]) == fewest])
+        else:
+            gene = random.choice(left)
+
+    return offspring
+
+def uniform(parents):
+    """Create a new child taking each gene from one of the parents at
+    random. The genes keep their positions, it is meant for genes that aren't
+    an order.
+
+    Parameters:
+        parents: two gene list [[g1, g2, g3, ..., gn], [g1, g2, g3, ..., gn]]
+    Return:
+        A gene list to the new child.
+    """
+
+    p1, p2 = parents
+
+    return [random.choice(genes) for genes in itertools.izip(p1, p2)]
+
+def positions(genes):
+    """Return:
+        A dict with the index of each gene.
+    """
+
+    return dict((gene, i) for i, gene in enumerate(genes))
+
+def cut_points(gene_number):
+    """Return:
+        A (begin, end) tuple, a random slice of the genes.
+    """
+
+    begin = random.randint(0, gene_number)
+    end = random.randint(0, gene_number)
+    if begin > end:
+        begin, end = end, begin
+
+    return begin, end
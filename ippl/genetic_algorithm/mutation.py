@@ -19,17 +19,41 @@
 
 from random import randint as rand
 
-def random(child):
+def random(child, classes=None):
     """Applying random mutation in a child.
 
     Parameters:
         child: a gene list [g1, g2, g3, ..., gn]
+        classes: the class of each gene value, or None. The genes of the
+            same class are interchangeable, they are never swapped.
     """
 
     gene_size = len(child) - 1
     source = rand(0, gene_size)
-    destination = rand(0, gene_size)
+    if classes is None:
+        destination = rand(0, gene_size)
+    else:
+        source_class = classes[child[source]]
+        destinations = [i for i in xrange(gene_size + 1)
+                        if classes[child[i]] != source_class]
+        if not destinations:
+            return child
+        destination = destinations[rand(0, len(destinations) - 1)]
 
     child[source], child[destination] = (child[destination], child[source])
 
     return child
+
+def reset(child, choices):
+    """Sets a random gene of a child to a random value.
+
+    Parameters:
+        child: a gene list [g1, g2, g3, ..., gn]
+        choices: the values of each gene, gi is one of choices[i]
+    """
+
+    i = rand(0, len(child) - 1)
+    values = choices[i]
+    child[i] = values[rand(0, len(values) - 1)]
+
+    return child
@@ -17,6 +17,7 @@
 # along with ippl.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import bisect
 import random
 
 def roulette(partition):
@@ -28,3 +29,140 @@ def roulette(partition):
             return i
 
     return 0
+
+
+class Sampler(object):
+
+    def draw(self, exclude=None):
+        """Draws a index.
+
+        Parameters:
+            exclude a index that can't be drawn, or None.
+        Return:
+            A integer.
+        """
+
+        pass
+
+    def draw_distinct(self, quantity):
+        """Draws different indices, the first one from all of them and each
+        next one from the ones not drawn yet.
+
+        Parameters:
+            quantity a integer, 1 or 2, not greater than the number of
+                weights.
+        Return:
+            A list of integers.
+        """
+
+        indices = [self.draw()]
+        if quantity > 1:
+            indices.append(self.draw(indices[0]))
+
+        return indices
+
+
+class Roulette(Sampler):
+
+    def __init__(self, weights):
+        """Creates a Roulette object.
+
+        Draws the indices of the weights with probability proportional to
+        them. The cumulative weights are built once, each draw is a binary
+        search on them.
+
+        Parameters:
+            weights a list of non-negative real numbers, the greater the
+                better. When all of them are 0 the draws are uniform.
+        """
+
+        super(Roulette, self).__init__()
+
+        self.weights = list(weights)
+        self.cumulative = []
+
+        total = 0.0
+        for weight in self.weights:
+            total += weight
+            self.cumulative.append(total)
+
+    def draw(self, exclude=None):
+        cumulative = self.cumulative
+        size = len(cumulative)
+        if exclude is None:
+            # With no weight at all, as when all the fitnesses are equal,
+            # every index is as good.
+            if cumulative[-1] <= 0:
+                return random.randint(0, size - 1)
+            pick = random.random() * cumulative[-1]
+        else:
+            # The interval of the excluded index is cut from the wheel.
+            weight = self.weights[exclude]
+            if cumulative[-1] - weight <= 0:
+                return (exclude + random.randint(1, size - 1)) % size
+
+            pick = random.random() * (cumulative[-1] - weight)
+            if pick >= cumulative[exclude] - weight:
+                pick += weight
+
+        return min(bisect.bisect_right(cumulative, pick), size - 1)
+
+
+class Rank(Roulette):
+
+    def __init__(self, weights, pressure=1.5):
+        """Creates a Rank object.
+
+        A roulette on the rank of the weights instead of on their values
+        (linear ranking), the selection doesn't depend on how far apart the
+        weights are.
+
+        Parameters:
+            weights a list of real numbers, the greater the better.
+            pressure a real number between 1 and 2, how many times the best
+                is expected to be drawn in len(weights) draws.
+        """
+
+        size = len(weights)
+        order = sorted(xrange(size), key=lambda i: weights[i])
+        ranks = [0.0] * size
+        for rank, i in enumerate(order):
+            if size > 1:
+                ranks[i] = ((2.0 - pressure) +
+                            2.0 * (pressure - 1.0) * rank / (size - 1))
+            else:
+                ranks[i] = 1.0
+
+        super(Rank, self).__init__(ranks)
+
+
+class Tournament(Sampler):
+
+    def __init__(self, weights, size=2):
+        """Creates a Tournament object.
+
+        Each draw is the best of size indices picked at random.
+
+        Parameters:
+            weights a list of real numbers, the greater the better.
+            size a integer, the number of indices on each tournament.
+        """
+
+        super(Tournament, self).__init__()
+
+        self.weights = list(weights)
+        self.size = size
+
+    def draw(self, exclude=None):
+        weights = self.weights
+        last = len(weights) - 1
+
+        best = None
+        for _ in xrange(self.size):
+            i = random.randint(0, last)
+            if exclude is not None and i == exclude and last:
+                i = (i + random.randint(1, last)) % (last + 1)
+            if best is None or weights[i] > weights[best]:
+                best = i
+
+        return best
@@ -0,0 +1,347 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from ippl.bottom_left_fill.sheet_shape import RectangularSheetShape
+from ippl.bottom_left_fill.spatial_index import GridIndex
+from ippl.nfp import geometry
+from ippl.shape.point import Point
+from ippl.shape.rectangle import Rectangle
+
+
+class NoFitPolygonPlacement(object):
+
+    def __init__(self):
+        """Creates a NoFitPolygonPlacement object.
+
+        Places each shape on the bottom-left point of the region where its
+        reference point (the left bottom corner of the bounding box) doesn't
+        make it overlap the sheetshape. The region is the inner-fit rectangle
+        of the sheet minus the no-fit polygons of the placed shapes.
+
+        The no-fit polygons are the Minkowski sums of the convex pieces of the
+        outer loops, so the shapes are never placed inside the holes of other
+        shapes.
+
+        The no-fit polygons are kept on the cache, when there is one, so the
+        next runs over the same shapes only compute the missing pairs. The
+        convex pieces are kept there too, by the (id, orientation) of the
+        shapes.
+        """
+
+        super(NoFitPolygonPlacement, self).__init__()
+
+        self.shapes = []
+        self.sheetshape = RectangularSheetShape()
+        # Not used by the placement, kept to be interchangeable with
+        # BottomLeftFill.
+        self.resolution = Point(25, 1)
+        self.epsilon = 1e-06
+        self.cache = None
+        # See BottomLeftFill.
+        self.bound = None
+        self.pruned = False
+
+        self._pieces = {}
+
+    def pieces(self, shape):
+        """Calculates the convex pieces of the shape outer loop, relative to
+        the left bottom corner of its bounding box.
+
+        Parameters:
+            shape a Shape object.
+        Return:
+            A list of convex polygons.
+        """
+
+        cache = self._pieces
+        if self.cache is not None:
+            cache = self.cache.pieces
+
+        key = (shape.id, shape.orientation)
+        pieces = cache.get(key)
+        if pieces is None:
+            bounding_box = shape.bounding_box
+            points = geometry.loop_points(shape.outer_loop,
+                bounding_box.left, bounding_box.bottom)
+            # The moves leave round-off errors on the coordinates, the
+            # profiles have 6 decimal places. Rounding them back makes the
+            # pieces the same wherever the shape is.
+            points = [(round(x, 6), round(y, 6)) for x, y in points]
+            pieces = geometry.convex_decomposition(points, self.epsilon)
+            cache[key] = pieces
+
+        return pieces
+
+    def no_fit_polygon(self, static_shape, shape):
+        """Calculates the no-fit polygon of the shape orbiting the static
+        shape, with the static shape reference point on the origin.
+
+        Parameters:
+            static_shape a Shape object.
+            shape a Shape object.
+        Return:
+            A tuple of convex polygons, their union is the no-fit polygon.
+        """
+
+        if self.cache is not None:
+            key = self.cache.key(static_shape, shape)
+            polygons = self.cache.get(key)
+            if polygons is not None:
+                return polygons
+
+        polygons = []
+        for static_piece in self.pieces(static_shape):
+            for piece in self.pieces(shape):
+                polygon = geometry.minkowski_difference(static_piece, piece)
+                if len(polygon) >= 3:
+                    polygons.append(tuple(polygon))
+
+        polygons = tuple(polygons)
+        if self.cache is not None:
+            self.cache.put(key, polygons)
+
+        return polygons
+
+    def inner_fit_rectangle(self, shape):
+        """Calculates the positions of the shape reference point where the
+        shape is inside the sheetshape rectangle. As in BottomLeftFill, the
+        sheet has no right limit.
+
+        Parameters:
+            shape a Shape object.
+        Return:
+            A (left, bottom, top) tuple, or None if the shape doesn't fit.
+        """
+
+        rectangle = self.sheetshape.rectangle
+        height = shape.bounding_box.size()[1]
+        top = rectangle.top - height
+        if top < rectangle.bottom - self.epsilon:
+            return None
+
+        return (rectangle.left, rectangle.bottom, max(top, rectangle.bottom))
+
+    def bottom_left_position(self, shape, limit=None):
+        """Finds the leftmost, then lowest, feasible reference point.
+
+        Only the points up to the limit are searched. The static shapes the
+        shape can't reach from there are found by the sheetshape index and
+        their no-fit polygons are not used.
+
+        Parameters:
+            shape a Shape object.
+            limit a real number, the largest x of the point, or None.
+        Return:
+            A (x, y) tuple, or None if the shape doesn't fit on the sheet
+            before the limit.
+        """
+
+        inner_fit = self.inner_fit_rectangle(shape)
+        if inner_fit is None:
+            return None
+
+        left, bottom, top = inner_fit
+        static_shapes = self.sheetshape
+        if limit is None:
+            limit = float("inf")
+        elif limit < left:
+            return None
+        else:
+            width, height = shape.bounding_box.size()
+            static_shapes = self.sheetshape.query(Rectangle(left, bottom,
+                limit + width, top + height))
+
+        polygons = []
+        for static_shape in static_shapes:
+            static_bounding_box = static_shape.bounding_box
+            x = static_bounding_box.left
+            y = static_bounding_box.bottom
+            for polygon in self.no_fit_polygon(static_shape, shape):
+                polygon = [(px + x, py + y) for px, py in polygon]
+                box = geometry.bounds(polygon)
+                # Past the limit a polygon can't have the points searched
+                # inside it.
+                if box[3] > bottom and box[1] < top and box[0] < limit:
+                    polygons.append((polygon, box))
+
+        if not polygons:
+            return (left, bottom)
+
+        epsilon = self.epsilon
+        # Cells of half the mean polygon size, few polygons on each.
+        cell_size = sum(max(box[2] - box[0], box[3] - box[1])
+                        for polygon, box in polygons) / len(polygons)
+        index = GridIndex(max(cell_size / 2, 1.0))
+        for i in xrange(len(polygons)):
+            polygon, box = polygons[i]
+            normals = geometry.edge_normals(polygon, epsilon)
+            polygons[i] = (polygon, box, normals)
+            index.insert(i, Rectangle(*box))
+
+        def blocking(point, exclude=None):
+            x, y = point
+            for i in index.query_point(x, y):
+                polygon, box, normals = polygons[i]
+                if (i != exclude and box[0] < x < box[2] and
+                        box[1] < y < box[3] and
+                        geometry.strictly_inside(point, normals, epsilon)):
+                    return i
+            return None
+
+        def clamp(point):
+            x, y = point
+            if (x < left - epsilon or x > limit or y < bottom - epsilon or
+                    y > top + epsilon):
+                return None
+            return (max(x, left), min(max(y, bottom), top))
+
+        best = None
+        for point in [(left, bottom), (left, top)]:
+            if blocking(point) is None and (best is None or point < best):
+                best = point
+
+        # The vertices inside other polygons are discarded, as well as the
+        # edges with both ends inside the same polygon, which are inside it
+        # because the polygons are convex.
+        edges = []
+        for i in xrange(len(polygons)):
+            polygon = polygons[i][0]
+            blocked = [blocking(point, i) for point in polygon]
+            size = len(polygon)
+            for k in xrange(size):
+                point = clamp(polygon[k])
+                if (point and blocked[k] is None and
+                        (best is None or point < best) and
+                        blocking(point) is None):
+                    best = point
+
+                l = (k + 1) % size
+                a, b = polygon[k], polygon[l]
+                if blocked[k] is not None and (blocked[k] == blocked[l] or
+                        geometry.strictly_inside(b,
+                            polygons[blocked[k]][2], epsilon)):
+                    continue
+                if blocked[l] is not None and geometry.strictly_inside(a,
+                        polygons[blocked[l]][2], epsilon):
+                    continue
+
+                edges.append((min(a[0], b[0]), max(a[0], b[0]),
+                              min(a[1], b[1]), max(a[1], b[1]), a, b))
+
+        for point in self._intersections(edges, left, bottom, top):
+            point = clamp(point)
+            if not point or (best is not None and point >= best):
+                continue
+            if blocking(point) is None:
+                best = point
+
+        return best
+
+    def _intersections(self, edges, left, bottom, top):
+        """Calculates the intersections between the edges and between the
+        edges and the inner-fit rectangle borders.
+        """
+
+        points = []
+        if not edges:
+            return points
+
+        right = max(edge[1] for edge in edges) + 1.0
+        borders = [((left, bottom), (right, bottom)),
+                   ((left, top), (right, top)),
+                   ((left, bottom), (left, top))]
+
+        for edge in edges:
+            for a, b in borders:
+                point = geometry.segment_intersection(edge[4], edge[5], a, b)
+                if point:
+                    points.append(point)
+
+        # Sweep on x, only edges with overlapping ranges are intersected.
+        edges.sort()
+        for i in xrange(len(edges)):
+            first = edges[i]
+            for j in xrange(i + 1, len(edges)):
+                second = edges[j]
+                if second[0] > first[1]:
+                    break
+                if second[2] > first[3] or second[3] < first[2]:
+                    continue
+
+                point = geometry.segment_intersection(first[4], first[5],
+                                                      second[4], second[5])
+                if point:
+                    points.append(point)
+
+        return points
+
+    def exceeds_bound(self):
+        bounding_box = self.sheetshape.bounding_box
+        return (self.bound is not None and bounding_box is not None and
+                bounding_box.size()[0] > self.bound)
+
+    def run(self):
+        rectangle = self.sheetshape.rectangle
+        self.pruned = False
+
+        # The convex pieces of every oriented shape are decomposed once,
+        # before the placement.
+        for orientations in self.shapes:
+            for shape in orientations:
+                self.pieces(shape)
+
+        for i in xrange(len(self.shapes)):
+            if self.exceeds_bound():
+                self.pruned = True
+                break
+
+            orientations = self.shapes[i]
+            best = None
+
+            for j in xrange(len(orientations)):
+                shape = orientations[j]
+                width = shape.bounding_box.size()[0]
+                # Only a position ending left of the best one, or as far
+                # and lower, is better.
+                limit = None
+                if best is not None:
+                    limit = best[0][0] - width + self.epsilon
+                position = self.bottom_left_position(shape, limit)
+                if position is None:
+                    continue
+
+                key = (position[0] + width, position[1])
+                if best is None or key < best[0]:
+                    best = (key, j, position)
+
+            if best is None:
+                # Nothing fits, the shape goes after the sheetshape.
+                shape = orientations[0]
+                x = rectangle.left
+                if self.sheetshape.bounding_box:
+                    x = self.sheetshape.bounding_box.right
+                position = (x, rectangle.bottom)
+            else:
+                shape = orientations[best[1]]
+                position = best[2]
+
+            shape.position(position[0], position[1])
+            self.sheetshape.append(shape)
+
+        return self.sheetshape.bounding_box
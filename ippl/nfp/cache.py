@@ -0,0 +1,188 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import collections
+import cPickle
+import os
+
+
+class NoFitPolygonCache(object):
+
+    def __init__(self, capacity=65536):
+        """Creates a NoFitPolygonCache object.
+
+        A bounded LRU cache of no-fit polygons. The no-fit polygon of two
+        oriented shapes doesn't depend on where they are, so it is stored with
+        the static shape reference point on the origin and keyed by the
+        (id, orientation) of both shapes.
+
+        The shape ids only mean something inside a profile, so the cache is
+        bound to the signature of the profile and cleared when it changes.
+
+        Parameters:
+            capacity a integer, the max number of no-fit polygons.
+        """
+
+        super(NoFitPolygonCache, self).__init__()
+
+        self.capacity = capacity
+        self.signature = None
+        self.filename = None
+
+        self.hits = 0
+        self.misses = 0
+        # The convex pieces of each oriented shape, see
+        # NoFitPolygonPlacement.pieces. They are not saved.
+        self.pieces = {}
+
+        self._entries = collections.OrderedDict()
+        self._dirty = False
+
+    @staticmethod
+    def key(static_shape, shape):
+        return (static_shape.id, static_shape.orientation,
+                shape.id, shape.orientation)
+
+    def bind(self, signature, filename=None):
+        """Binds the cache to a profile, loading the no-fit polygons saved on
+        the file on the first time.
+
+        Parameters:
+            signature a string identifying the profile.
+            filename a string, or None to keep the cache on memory only.
+        """
+
+        if signature == self.signature and filename == self.filename:
+            return
+
+        if signature != self.signature:
+            self.clear()
+        self.signature = signature
+        self.filename = filename
+
+        if filename:
+            self.load(filename)
+
+    def get(self, key):
+        polygons = self._entries.pop(key, None)
+        if polygons is None:
+            self.misses += 1
+            return None
+
+        self._entries[key] = polygons
+        self.hits += 1
+        return polygons
+
+    def put(self, key, polygons):
+        self._entries.pop(key, None)
+        self._entries[key] = polygons
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        self._dirty = True
+
+    def load(self, filename):
+        """Adds the no-fit polygons saved on the file, if it was saved for
+        the same signature.
+
+        Return:
+            The number of no-fit polygons loaded.
+        """
+
+        try:
+            f = open(filename, "rb")
+        except IOError:
+            return 0
+
+        # A truncated, foreign or old file is ignored, as a missing one.
+        try:
+            data = cPickle.load(f)
+        except Exception:
+            return 0
+        finally:
+            f.close()
+
+        if (not isinstance(data, dict) or
+                data.get("signature") != self.signature):
+            return 0
+
+        try:
+            entries = [(key, polygons)
+                       for key, polygons in data.get("entries", [])]
+        except (TypeError, ValueError):
+            return 0
+
+        for key, polygons in entries:
+            if key not in self._entries:
+                self.put(key, polygons)
+        self._dirty = False
+
+        return len(entries)
+
+    def save(self, filename=None):
+        """Saves the no-fit polygons on the file, merged with the ones
+        already saved there for the same signature. The file is replaced at
+        once, concurrent saves may lose the entries of each other, never
+        corrupt the file.
+
+        Parameters:
+            filename a string, or None to use the bound file.
+        """
+
+        filename = filename or self.filename
+        if not filename or not self._dirty:
+            return
+
+        saved = NoFitPolygonCache(self.capacity)
+        saved.signature = self.signature
+        saved.load(filename)
+        for key, polygons in self._entries.iteritems():
+            saved.put(key, polygons)
+
+        temporary = "{}.{}".format(filename, os.getpid())
+        f = open(temporary, "wb")
+        try:
+            cPickle.dump({"signature": self.signature,
+                          "entries": saved._entries.items()},
+                         f, cPickle.HIGHEST_PROTOCOL)
+        finally:
+            f.close()
+        os.rename(temporary, filename)
+
+        self._dirty = False
+
+    def clear(self):
+        self._entries.clear()
+        self.pieces.clear()
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __str__(self):
+        return "NFP cache: {} entries, {} hits, {} misses".format(
+            len(self), self.hits, self.misses)
+
+
+# One cache per process, it lasts across the fitness calculations.
+nfp_cache = NoFitPolygonCache()
@@ -0,0 +1,295 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import math
+
+from ippl import util
+
+# The polygons here are lists of (x, y) tuples, in counterclockwise order.
+
+def cross(o, a, b):
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+def signed_area(points):
+    size = len(points)
+    area = 0.0
+    for i in xrange(size):
+        x1, y1 = points[i]
+        x2, y2 = points[(i + 1) % size]
+        area += x1 * y2 - x2 * y1
+
+    return area / 2.0
+
+def loop_points(loop, x=0.0, y=0.0):
+    """Creates a counterclockwise polygon from a loop of primitives.
+
+    Parameters:
+        loop a list of Primitives.
+        x a real number, subtracted from the x coordinates.
+        y a real number, subtracted from the y coordinates.
+    Return:
+        A list of (x, y) tuples without repeated consecutive points.
+    """
+
+    points = []
+    for primitive in loop:
+        point = (primitive.x1 - x, primitive.y1 - y)
+        if not points or not _same_point(points[-1], point):
+            points.append(point)
+
+    if len(points) > 1 and _same_point(points[0], points[-1]):
+        points.pop()
+
+    if signed_area(points) < 0:
+        points.reverse()
+
+    return points
+
+def _same_point(a, b):
+    return util.almost_equal(a[0], b[0]) and util.almost_equal(a[1], b[1])
+
+def convex_hull(points):
+    """Calculates the convex hull of a set of points (monotone chain).
+
+    Parameters:
+        points a list of (x, y) tuples.
+    Return:
+        A counterclockwise polygon without collinear points.
+    """
+
+    points = sorted(set(points))
+    if len(points) <= 2:
+        return points
+
+    lower = []
+    for point in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], point) <= 0:
+            lower.pop()
+        lower.append(point)
+
+    upper = []
+    for point in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], point) <= 0:
+            upper.pop()
+        upper.append(point)
+
+    return lower[:-1] + upper[:-1]
+
+def is_convex(points, epsilon=1e-06):
+    size = len(points)
+    for i in xrange(size):
+        if cross(points[i - 1], points[i], points[(i + 1) % size]) < -epsilon:
+            return False
+
+    return True
+
+def _inside_triangle(point, a, b, c):
+    return (cross(a, b, point) >= 0 and cross(b, c, point) >= 0 and
+            cross(c, a, point) >= 0)
+
+def triangulate(points, epsilon=1e-06):
+    """Splits a simple counterclockwise polygon in triangles (ear clipping).
+
+    Parameters:
+        points a list of (x, y) tuples.
+        epsilon a real number.
+    Return:
+        A list of triangles, each one a list of three point indices, or None
+        if the polygon could not be triangulated.
+    """
+
+    indices = range(len(points))
+    triangles = []
+
+    while len(indices) > 3:
+        size = len(indices)
+        for k in xrange(size):
+            i, j, l = indices[k - 1], indices[k], indices[(k + 1) % size]
+            a, b, c = points[i], points[j], points[l]
+            if cross(a, b, c) <= epsilon:
+                continue
+
+            ear = True
+            for m in indices:
+                if m in (i, j, l):
+                    continue
+                if _inside_triangle(points[m], a, b, c):
+                    ear = False
+                    break
+
+            if ear:
+                triangles.append([i, j, l])
+                del indices[k]
+                break
+        else:
+            return None
+
+    if cross(points[indices[0]], points[indices[1]],
+             points[indices[2]]) > epsilon:
+        triangles.append(indices)
+
+    return triangles
+
+def _merge(first, second, a, b):
+    """Joins two polygons of indices sharing the edge a->b (first) and b->a
+    (second).
+    """
+
+    i = first.index(b)
+    first = first[i:] + first[:i]
+    j = second.index(a)
+    second = second[j:] + second[:j]
+
+    return first + second[1:-1]
+
+def _shared_edge(first, second):
+    size = len(first)
+    for k in xrange(size):
+        a, b = first[k], first[(k + 1) % size]
+        if b in second:
+            l = second.index(b)
+            if second[(l + 1) % len(second)] == a:
+                return a, b
+
+    return None
+
+def convex_decomposition(points, epsilon=1e-06):
+    """Splits a simple polygon in convex polygons, merging the triangles of
+    the ear clipping while the result stays convex (Hertel-Mehlhorn).
+
+    Parameters:
+        points a counterclockwise list of (x, y) tuples.
+        epsilon a real number.
+    Return:
+        A list of counterclockwise convex polygons. When the polygon can't be
+        triangulated its convex hull is returned, which is conservative for
+        the overlap tests.
+    """
+
+    if len(points) < 3:
+        return [list(points)]
+
+    if is_convex(points, epsilon):
+        return [convex_hull(points)]
+
+    pieces = triangulate(points, epsilon)
+    if not pieces:
+        return [convex_hull(points)]
+
+    merged = True
+    while merged:
+        merged = False
+        for k in xrange(len(pieces)):
+            for l in xrange(k + 1, len(pieces)):
+                edge = _shared_edge(pieces[k], pieces[l])
+                if not edge:
+                    continue
+
+                piece = _merge(pieces[k], pieces[l], edge[0], edge[1])
+                if is_convex([points[i] for i in piece], epsilon):
+                    pieces[k] = piece
+                    del pieces[l]
+                    merged = True
+                    break
+            if merged:
+                break
+
+    return [convex_hull([points[i] for i in piece]) for piece in pieces]
+
+def minkowski_difference(fixed, orbiting):
+    """Calculates the no-fit polygon of two convex polygons, the set of
+    translations of the orbiting polygon where it overlaps the fixed one.
+
+    Parameters:
+        fixed a convex polygon.
+        orbiting a convex polygon.
+    Return:
+        The convex polygon fixed (+) (-orbiting).
+    """
+
+    return convex_hull([(fx - ox, fy - oy)
+                        for fx, fy in fixed for ox, oy in orbiting])
+
+def bounds(points):
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+
+    return (min(xs), min(ys), max(xs), max(ys))
+
+def edge_normals(polygon, epsilon=1e-06):
+    """Calculates the inward unit normals of a counterclockwise polygon.
+
+    Return:
+        A list of (x, y, normal x, normal y) tuples, one for each edge longer
+        than epsilon.
+    """
+
+    normals = []
+    size = len(polygon)
+    for i in xrange(size):
+        x1, y1 = polygon[i]
+        x2, y2 = polygon[(i + 1) % size]
+        dx, dy = x2 - x1, y2 - y1
+        length = math.sqrt(dx * dx + dy * dy)
+        if length >= epsilon:
+            normals.append((x1, y1, -dy / length, dx / length))
+
+    return normals
+
+def strictly_inside(point, normals, epsilon=1e-06):
+    """Checks whether a point is inside a convex polygon and away from its
+    boundary by more than epsilon.
+
+    Parameters:
+        point a (x, y) tuple.
+        normals the edge_normals of the polygon.
+        epsilon a real number.
+    """
+
+    if len(normals) < 3:
+        return False
+
+    x, y = point
+    for x1, y1, nx, ny in normals:
+        if (x - x1) * nx + (y - y1) * ny <= epsilon:
+            return False
+
+    return True
+
+def segment_intersection(a, b, c, d):
+    """Calculates the intersection point of the segments ab and cd.
+
+    Return:
+        A (x, y) tuple, or None if the segments are parallel or don't
+        intersect.
+    """
+
+    rx, ry = b[0] - a[0], b[1] - a[1]
+    sx, sy = d[0] - c[0], d[1] - c[1]
+    denominator = rx * sy - ry * sx
+    if util.almost_equal(denominator, 0.0):
+        return None
+
+    qx, qy = c[0] - a[0], c[1] - a[1]
+    t = (qx * sy - qy * sx) / denominator
+    u = (qx * ry - qy * rx) / denominator
+    if 0.0 <= t <= 1.0 and 0.0 <= u <= 1.0:
+        return (a[0] + t * rx, a[1] + t * ry)
+
+    return None
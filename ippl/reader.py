@@ -17,11 +17,17 @@
 # along with ippl.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import argparse
 import ast
+import hashlib
+import mmap
 import re
+import struct
 import sys
 
 from ippl.render import *
+from ippl.shape.compact import CompactShape
+from ippl.shape.catalogue import ShapeCatalogue
 
 
 class BLFReader(object):
@@ -45,10 +51,18 @@ class BLFReader(object):
                            r"(?P<end>\([-]*\d+\.\d+, [-]*\d+\.\d+\))$")
     }
 
+    # The header of the binary profiles: the magic, the signature of the
+    # text profile, the size of the sheet and the rotation, followed by a
+    # ShapeCatalogue with the orientations of the shapes.
+    BINARY_MAGIC = "IPPLBLF1"
+    BINARY_HEADER = struct.Struct("<8s32s3q")
+
     def __init__(self):
         super(BLFReader, self).__init__()
 
         self.current_state = self.STATES["profile"]
+        # Creates CompactShapes instead of Shapes.
+        self.compact = False
 
     @staticmethod
     def profile(groups):
@@ -66,8 +80,8 @@ class BLFReader(object):
 
     @staticmethod
     def create_point(groups):
-        begin = ast.literal_eval(groups["begin"])
-        return Point(util.round_number(begin[0]), util.round_number(begin[1]))
+        x, y = groups["begin"][1:-1].split(",")
+        return Point(util.round_number(float(x)), util.round_number(float(y)))
 
     @staticmethod
     def create_rotated_points(points, angle):
@@ -96,9 +110,11 @@ class BLFReader(object):
         return loop
 
     @staticmethod
-    def create_shape(shape_id, outer_points, inner_points_list):
+    def create_shape(shape_id, outer_points, inner_points_list,
+            orientation=0):
         shape = Shape()
         shape.id = shape_id
+        shape.orientation = orientation
         shape.outer_loop = BLFReader.create_loop(outer_points)
         for point_loop in inner_points_list:
             shape.inner_loops.append(BLFReader.create_loop(point_loop))
@@ -126,7 +142,7 @@ class BLFReader(object):
             if util.almost_equal(angle, 0.0):
                 shapes.append(
                     BLFReader.create_shape(shape_id, outer_points,
-                        inner_points_list))
+                        inner_points_list, i))
             else:
                 outer_points_rotated = (
                     BLFReader.create_rotated_points(outer_points, angle))
@@ -137,11 +153,122 @@ class BLFReader(object):
                     inner_points_rotated_list.append(inner_points)
 
                 shapes.append(BLFReader.create_shape(shape_id,
-                    outer_points_rotated, inner_points_rotated_list))
+                    outer_points_rotated, inner_points_rotated_list, i))
 
         return shapes
 
+    @staticmethod
+    def create_shape_from_coordinates(shape_id, orientation, coordinates,
+            loop_sizes):
+        """Creates a Shape with the lines of a coordinates buffer, see
+        CompactShape.from_coordinates.
+        """
+
+        loops = []
+        offset = 0
+        for size in loop_sizes:
+            loop = []
+            for i in xrange(offset, offset + size * 4, 4):
+                x1, y1, x2, y2 = coordinates[i:i + 4]
+                line = Line(Point(x1, y1), Point(x2, y2))
+                line.calculate_bounding_box()
+                loop.append(line)
+            loops.append(loop)
+            offset += size * 4
+
+        shape = Shape()
+        shape.id = shape_id
+        shape.orientation = orientation
+        shape.outer_loop = loops[0]
+        shape.inner_loops = loops[1:]
+        shape.update()
+
+        return shape
+
+    @staticmethod
+    def is_binary(filename):
+        f = open(filename, "rb")
+        magic = f.read(len(BLFReader.BINARY_MAGIC))
+        f.close()
+
+        return magic == BLFReader.BINARY_MAGIC
+
+    @staticmethod
+    def save_binary(blf_data, filename):
+        """Saves the profile on the binary format read by load_binary.
+
+        Parameters:
+            blf_data the data of the profile, as returned by load.
+            filename a string.
+        """
+
+        size = blf_data["profile"]["size"]
+        f = open(filename, "wb")
+        f.write(BLFReader.BINARY_HEADER.pack(BLFReader.BINARY_MAGIC,
+            blf_data["signature"], size[0], size[1],
+            blf_data["profile"]["rotation"]))
+        ShapeCatalogue(blf_data["shapes"]).write(f)
+        f.close()
+
+    def load_binary(self, filename, render=False):
+        """Loads a profile saved by save_binary. The file is mapped on
+        memory, the shapes are created from the coordinates there, rotated
+        already, without parsing them.
+        """
+
+        f = open(filename, "rb")
+        # A copy on write mapping, the compact shapes are views of it.
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        f.close()
+
+        _, signature, width, height, rotation = (
+            BLFReader.BINARY_HEADER.unpack_from(buffer))
+        catalogue = ShapeCatalogue.from_buffer(buffer,
+                                               BLFReader.BINARY_HEADER.size)
+
+        blf_data = {}
+        blf_data["signature"] = signature
+        blf_data["profile"] = { "size": (width, height),
+                                "rotation": rotation }
+        if self.compact:
+            blf_data["shapes"] = catalogue.shapes()
+        else:
+            blf_data["shapes"] = [
+                [BLFReader.create_shape_from_coordinates(
+                    *catalogue.coordinates(i, j))
+                 for j in xrange(catalogue.orientations(i))]
+                for i in xrange(len(catalogue))]
+
+        if render:
+            BLFReader.render_shapes(blf_data["shapes"])
+
+        return blf_data
+
+    @staticmethod
+    def render_shapes(shapes):
+        for i in xrange(len(shapes)):
+            orientations = shapes[i]
+            for j in xrange(len(orientations)):
+                shape = orientations[j]
+                shape.position(0, 0)
+
+                aabb = shape.bounding_box
+                aabb_size = aabb.size()
+                size = (int(aabb_size[0]) + 1, int(aabb_size[1]) + 1)
+                r = Render()
+                r.image_size = size
+                r.initialize()
+                r.shape(shape)
+                r.save("reader{}_{}.png".format(i, j))
+
     def load(self, filename, render=False):
+        """Loads a profile, on the text format or on the binary format saved
+        by save_binary.
+        """
+
+        if BLFReader.is_binary(filename):
+            return self.load_binary(filename, render)
+
         f = open(filename, "r")
         lines = f.readlines()
         f.close()
@@ -149,6 +276,7 @@ class BLFReader(object):
         self.current_state = self.STATES["profile"]
 
         blf_data = {}
+        blf_data["signature"] = hashlib.md5("".join(lines)).hexdigest()
         line_number = 0
         shape_data = {}
 
@@ -265,35 +393,34 @@ class BLFReader(object):
                 inner_points_list = []
                 break
 
+        if self.compact:
+            shapes = [[CompactShape.from_shape(shape) for shape in orientations]
+                      for orientations in shapes]
         blf_data["shapes"] = shapes
 
         if render:
-            for i in xrange(len(shapes)):
-                orientations = shapes[i]
-                for j in xrange(len(orientations)):
-                    shape = orientations[j]
-                    shape.position(0, 0)
-
-                    aabb = shape.bounding_box
-                    aabb_size = aabb.size()
-                    size = (int(aabb_size[0]) + 1, int(aabb_size[1]) + 1)
-                    r = Render()
-                    r.image_size = size
-                    r.initialize()
-                    r.shape(shape)
-                    r.save("reader{}_{}.png".format(i, j))
+            BLFReader.render_shapes(shapes)
 
         return blf_data
 
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
-        reader = BLFReader()
-        filename = sys.argv[1]
-        render = False
-        if len(sys.argv) > 2:
-            render = (sys.argv[2] == "yes")
-
-        reader.load(filename, render)
-    else:
-        print "Usage: {} <blf_data> [render=(yes/no)]".format(sys.argv[0])
+    parser = argparse.ArgumentParser(description="Loads a profile.")
+    parser.add_argument("file", type=str,
+                        help="The profile, on the text or the binary format")
+    parser.add_argument("render", nargs="?", choices=["yes", "no"],
+                        default="no",
+                        help="Save a image of each orientation of the shapes "
+                        "(default: no)")
+    parser.add_argument("--convert", type=str, default=None,
+                        metavar="filename",
+                        help="Save the profile on the binary format, loaded "
+                        "without parsing it")
+    args = parser.parse_args()
+
+    reader = BLFReader()
+    blf_data = reader.load(args.file, args.render == "yes")
+    if args.convert:
+        BLFReader.save_binary(blf_data, args.convert)
+        print "Profile \"{}\" saved on \"{}\".".format(args.file,
+                                                       args.convert)
 
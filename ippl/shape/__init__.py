@@ -20,4 +20,8 @@
 from ippl.shape.point import *
 from ippl.shape.rectangle import *
 from ippl.shape.line import *
+from ippl.shape.bvh import *
+from ippl.shape import kernels
 from ippl.shape.shape import *
+from ippl.shape.compact import *
+from ippl.shape.catalogue import *
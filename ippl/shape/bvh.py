@@ -0,0 +1,160 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import copy
+
+# Node layout: [left, bottom, right, top, first child, second child, indices].
+_LEFT, _BOTTOM, _RIGHT, _TOP, _FIRST, _SECOND, _INDICES = range(7)
+
+
+class BoundingVolumeHierarchy(object):
+
+    def __init__(self, primitives, leaf_size=4):
+        """Creates a BoundingVolumeHierarchy object.
+
+        The boxes are kept on the coordinates of the primitives when the tree
+        was built, the translations applied after that are accumulated on the
+        offset.
+
+        Parameters:
+            primitives a list of Primitives.
+            leaf_size a integer number.
+        """
+
+        super(BoundingVolumeHierarchy, self).__init__()
+
+        self.primitives = list(primitives)
+        self.leaf_size = leaf_size
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+
+        self.boxes = []
+        for primitive in self.primitives:
+            self.boxes.append((min(primitive.x1, primitive.x2),
+                               min(primitive.y1, primitive.y2),
+                               max(primitive.x1, primitive.x2),
+                               max(primitive.y1, primitive.y2)))
+
+        self.root = None
+        if self.boxes:
+            self.root = self._build(range(len(self.boxes)))
+
+    def _build(self, indices):
+        boxes = self.boxes
+        left = min(boxes[i][0] for i in indices)
+        bottom = min(boxes[i][1] for i in indices)
+        right = max(boxes[i][2] for i in indices)
+        top = max(boxes[i][3] for i in indices)
+
+        if len(indices) <= self.leaf_size:
+            return [left, bottom, right, top, None, None, indices]
+
+        if (right - left) >= (top - bottom):
+            center = lambda i: boxes[i][0] + boxes[i][2]
+        else:
+            center = lambda i: boxes[i][1] + boxes[i][3]
+
+        indices = sorted(indices, key=center)
+        half = len(indices) // 2
+
+        return [left, bottom, right, top, self._build(indices[:half]),
+                self._build(indices[half:]), None]
+
+    @staticmethod
+    def _half_perimeter(node):
+        return node[_RIGHT] - node[_LEFT] + node[_TOP] - node[_BOTTOM]
+
+    def move(self, x, y):
+        self.offset_x += x
+        self.offset_y += y
+
+    def share(self, primitives):
+        """Creates a BoundingVolumeHierarchy on other primitives with the
+        same coordinates, the boxes and the tree are shared, they are never
+        changed after being built.
+
+        Parameters:
+            primitives a list of Primitives.
+        Return:
+            A BoundingVolumeHierarchy object with the offset of this one.
+        """
+
+        hierarchy = copy.copy(self)
+        hierarchy.primitives = list(primitives)
+
+        return hierarchy
+
+    def intersect_pairs(self, other, epsilon=1e-06):
+        """Finds the pairs of primitives whose bounding boxes intersect.
+
+        Parameters:
+            other a BoundingVolumeHierarchy object.
+            epsilon a real number, the tolerance added to the boxes.
+        Return:
+            A list of (primitive, other primitive) tuples, in the same order of
+            a nested loop over the primitives of both hierarchies.
+        """
+
+        if self.root is None or other.root is None:
+            return []
+
+        # Translation from the other tree coordinates to this tree coordinates.
+        dx = other.offset_x - self.offset_x
+        dy = other.offset_y - self.offset_y
+
+        boxes = self.boxes
+        other_boxes = other.boxes
+        pairs = []
+        stack = [(self.root, other.root)]
+
+        while stack:
+            node, other_node = stack.pop()
+            if (node[_LEFT] > other_node[_RIGHT] + dx + epsilon or
+                    node[_RIGHT] < other_node[_LEFT] + dx - epsilon or
+                    node[_BOTTOM] > other_node[_TOP] + dy + epsilon or
+                    node[_TOP] < other_node[_BOTTOM] + dy - epsilon):
+                continue
+
+            node_leaf = node[_INDICES] is not None
+            other_leaf = other_node[_INDICES] is not None
+
+            if node_leaf and other_leaf:
+                for i in node[_INDICES]:
+                    box = boxes[i]
+                    for j in other_node[_INDICES]:
+                        other_box = other_boxes[j]
+                        if not (box[0] > other_box[2] + dx + epsilon or
+                                box[2] < other_box[0] + dx - epsilon or
+                                box[1] > other_box[3] + dy + epsilon or
+                                box[3] < other_box[1] + dy - epsilon):
+                            pairs.append((i, j))
+            elif other_leaf or (not node_leaf and
+                    self._half_perimeter(node) >=
+                    self._half_perimeter(other_node)):
+                stack.append((node[_FIRST], other_node))
+                stack.append((node[_SECOND], other_node))
+            else:
+                stack.append((node, other_node[_FIRST]))
+                stack.append((node, other_node[_SECOND]))
+
+        pairs.sort()
+        primitives = self.primitives
+        other_primitives = other.primitives
+
+        return [(primitives[i], other_primitives[j]) for i, j in pairs]
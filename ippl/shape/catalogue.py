@@ -0,0 +1,279 @@
+#
+# Copyright (C) 2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import array
+import copy
+import ctypes
+import mmap
+import struct
+import sys
+
+from ippl.shape.compact import CompactShape
+
+
+class ShapeCatalogue(object):
+
+    # The values of each oriented shape on the index table: the id, the
+    # orientation, the offset of its coordinates on the buffer, the index of
+    # its first loop size and the number of loops.
+    ENTRY_SIZE = 5
+    ITEM_SIZE = array.array("d").itemsize
+    # The sizes of the tables written by write.
+    COUNTS = struct.Struct("<4q")
+
+    def __init__(self, shapes=()):
+        """Creates a ShapeCatalogue object.
+
+        Keeps the coordinates of all the orientations of the shapes on a
+        single read only buffer, four values (x1, y1, x2, y2) for each
+        primitive, see CompactShape. The buffer is a shared anonymous mmap,
+        the processes forked after it is created map the same pages instead
+        of having their own copy of the shapes.
+
+        The shapes created by the catalogue are views of the buffer, moved
+        by their own origin, and the copies of a shape share their
+        hierarchy, so each process creating them only has its own primitive
+        objects, see shapes.
+
+        Parameters:
+            shapes a list of lists of Shape objects, the orientations of each
+                shape.
+        """
+
+        super(ShapeCatalogue, self).__init__()
+
+        coordinates = array.array("d")
+        self._entries = array.array("l")
+        self._loop_sizes = array.array("l")
+        self._first = array.array("l", [0])
+
+        # The copies with the same primitives, in the same order, share
+        # their coordinates.
+        copies = {}
+        for orientations in shapes:
+            for shape in orientations:
+                values = array.array("d")
+                loop_sizes = []
+                for loop in [shape.outer_loop] + list(shape.inner_loops):
+                    for primitive in loop:
+                        values.extend((primitive.x1, primitive.y1,
+                                       primitive.x2, primitive.y2))
+                    loop_sizes.append(len(loop))
+
+                key = (values.tostring(), tuple(loop_sizes))
+                if key not in copies:
+                    copies[key] = (len(coordinates), len(self._loop_sizes),
+                                   len(loop_sizes))
+                    coordinates.extend(values)
+                    self._loop_sizes.extend(loop_sizes)
+                self._entries.extend((shape.id, shape.orientation) +
+                                     copies[key])
+            self._first.append(len(self._entries) / self.ENTRY_SIZE)
+
+        self._size = len(coordinates)
+        self._buffer = ShapeCatalogue.create_buffer(coordinates.tostring())
+        # Where the coordinates begin on the buffer.
+        self._base = 0
+        self._byteswap = False
+        self._view = None
+        # The hierarchies of the shapes created, by their coordinates.
+        self._hierarchies = {}
+
+    @staticmethod
+    def create_buffer(data):
+        # A mmap can't be empty.
+        buffer = mmap.mmap(-1, max(len(data), 1))
+        buffer.write(data)
+
+        return buffer
+
+    def orientations(self, index):
+        """The number of orientations of the shape at the index."""
+
+        return self._first[index + 1] - self._first[index]
+
+    @staticmethod
+    def from_buffer(buffer, offset=0):
+        """Creates a ShapeCatalogue on a buffer with a catalogue saved by
+        write, the coordinates are read from the buffer when the shapes are
+        created.
+
+        Parameters:
+            buffer a mmap object, or a string.
+            offset a integer, where the catalogue begins on the buffer.
+        Return:
+            A ShapeCatalogue object.
+        """
+
+        catalogue = ShapeCatalogue()
+        counts = ShapeCatalogue.COUNTS.unpack_from(buffer, offset)
+        offset += ShapeCatalogue.COUNTS.size
+
+        tables = []
+        for count in counts[:3]:
+            tables.append(array.array("l", struct.unpack_from(
+                "<{}q".format(count), buffer, offset)))
+            offset += count * 8
+        catalogue._first, catalogue._entries, catalogue._loop_sizes = tables
+
+        catalogue._size = counts[3]
+        catalogue._buffer = buffer
+        catalogue._base = offset
+        catalogue._byteswap = sys.byteorder != "little"
+
+        return catalogue
+
+    def write(self, f):
+        """Writes the catalogue to a file: the number of values of each table
+        and the tables of shapes, entries and loop sizes, as int64, and the
+        coordinates, as float64, all of them little endian.
+
+        Parameters:
+            f a file object opened for binary writing.
+        """
+
+        f.write(self.COUNTS.pack(len(self._first), len(self._entries),
+                                 len(self._loop_sizes), self._size))
+        for table in (self._first, self._entries, self._loop_sizes):
+            f.write(struct.pack("<{}q".format(len(table)), *table))
+
+        coordinates = self.read(0, self._size)
+        if sys.byteorder != "little":
+            coordinates.byteswap()
+        f.write(coordinates.tostring())
+
+    def read(self, offset, size):
+        """Copies size coordinates from the offset of the buffer.
+
+        Return:
+            A array('d') object.
+        """
+
+        begin = self._base + offset * self.ITEM_SIZE
+        end = begin + size * self.ITEM_SIZE
+        coordinates = array.array("d")
+        coordinates.fromstring(self._buffer[begin:end])
+        if self._byteswap:
+            coordinates.byteswap()
+
+        return coordinates
+
+    def coordinates(self, index, orientation):
+        """Finds a orientation of a shape.
+
+        Parameters:
+            index a integer, the index of the shape.
+            orientation a integer, the index of the orientation.
+        Return:
+            A (id, orientation, coordinates, loop sizes) tuple, see
+            CompactShape.from_coordinates. The coordinates are a copy.
+        """
+
+        shape_id, shape_orientation, offset, loop_sizes = self._entry(index,
+            orientation)
+
+        return (shape_id, shape_orientation,
+                self.read(offset, sum(loop_sizes) * 4), loop_sizes)
+
+    def _entry(self, index, orientation):
+        entry = (self._first[index] + orientation) * self.ENTRY_SIZE
+        shape_id, shape_orientation, offset, first_loop, loops = (
+            self._entries[entry:entry + self.ENTRY_SIZE])
+        loop_sizes = list(self._loop_sizes[first_loop:first_loop + loops])
+
+        return shape_id, shape_orientation, offset, loop_sizes
+
+    def view(self):
+        """Maps all the coordinates of the buffer, without copying them. The
+        map is created once by each process.
+
+        Return:
+            A ctypes array of doubles, or None if the buffer can't be mapped,
+            when it is a string, a read only mmap or has other byte order.
+        """
+
+        if self._view is None and not self._byteswap:
+            try:
+                self._view = (ctypes.c_double * self._size).from_buffer(
+                    self._buffer, self._base)
+            except TypeError:
+                pass
+
+        return self._view
+
+    def shape(self, index, orientation):
+        """Creates a orientation of a shape.
+
+        Parameters:
+            index a integer, the index of the shape.
+            orientation a integer, the index of the orientation.
+        Return:
+            A CompactShape object on the coordinates of the buffer, they
+            must not be changed through its primitives.
+        """
+
+        shape_id, shape_orientation, offset, loop_sizes = self._entry(index,
+            orientation)
+
+        coordinates = self.view()
+        if coordinates is None:
+            return CompactShape.from_coordinates(shape_id, shape_orientation,
+                self.read(offset, sum(loop_sizes) * 4), loop_sizes)
+
+        # The copies with the same coordinates share their hierarchy too.
+        shape = CompactShape.from_coordinates(shape_id, shape_orientation,
+            coordinates, loop_sizes, offset, self._hierarchies.get(offset))
+        if offset not in self._hierarchies:
+            self._hierarchies[offset] = copy.copy(shape.bvh)
+
+        return shape
+
+    def shapes(self):
+        """Creates all the shapes.
+
+        Return:
+            A list of lists of CompactShape objects, the orientations of each
+            shape, in the order they were given to the catalogue.
+        """
+
+        return [[self.shape(i, j) for j in xrange(self.orientations(i))]
+                for i in xrange(len(self))]
+
+    def __len__(self):
+        return len(self._first) - 1
+
+    def __getstate__(self):
+        # Only the forked processes share the buffer, the other ones get a
+        # copy of it.
+        state = self.__dict__.copy()
+        state["_buffer"] = self.read(0, self._size).tostring()
+        state["_base"] = 0
+        state["_byteswap"] = False
+        state["_view"] = None
+        state["_hierarchies"] = {}
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._buffer = ShapeCatalogue.create_buffer(state["_buffer"])
+
+    def __str__(self):
+        return "Shape catalogue: {} shapes, {} bytes".format(len(self),
+            self._size * self.ITEM_SIZE)
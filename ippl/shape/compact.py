@@ -0,0 +1,403 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import array
+import copy
+
+from ippl.shape.point import Point
+from ippl.shape.rectangle import Rectangle
+from ippl.shape.line import Line
+from ippl.shape.shape import Shape
+from ippl.shape.bvh import BoundingVolumeHierarchy
+from ippl.shape import kernels
+
+
+class LineView(Line):
+
+    __slots__ = ("_coordinates", "_offset", "_origin")
+
+    def __init__(self, coordinates, offset, origin=None):
+        """Creates a LineView object.
+
+        A Line on four values (x1, y1, x2, y2) of a coordinates buffer,
+        translated by a origin. The points and the bounding box are created
+        on each access, changing them doesn't change the line.
+
+        Parameters:
+            coordinates a array('d') object.
+            offset a integer, the index of x1 on the buffer.
+            origin a array('d') object with the (x, y) translation, shared
+                by the views of a shape.
+        """
+
+        # Line.__init__ is not called, it would create the points.
+        self._coordinates = coordinates
+        self._offset = offset
+        if origin is None:
+            origin = array.array("d", (0.0, 0.0))
+        self._origin = origin
+
+    @property
+    def x1(self):
+        return self._coordinates[self._offset] + self._origin[0]
+
+    @x1.setter
+    def x1(self, value):
+        self._coordinates[self._offset] = value - self._origin[0]
+
+    @property
+    def y1(self):
+        return self._coordinates[self._offset + 1] + self._origin[1]
+
+    @y1.setter
+    def y1(self, value):
+        self._coordinates[self._offset + 1] = value - self._origin[1]
+
+    @property
+    def x2(self):
+        return self._coordinates[self._offset + 2] + self._origin[0]
+
+    @x2.setter
+    def x2(self, value):
+        self._coordinates[self._offset + 2] = value - self._origin[0]
+
+    @property
+    def y2(self):
+        return self._coordinates[self._offset + 3] + self._origin[1]
+
+    @y2.setter
+    def y2(self, value):
+        self._coordinates[self._offset + 3] = value - self._origin[1]
+
+    @property
+    def begin(self):
+        return Point(self.x1, self.y1)
+
+    @property
+    def end(self):
+        return Point(self.x2, self.y2)
+
+    @property
+    def bounding_box(self):
+        x1, y1, x2, y2 = self._coordinates[self._offset:self._offset + 4]
+        x, y = self._origin
+        return Rectangle(min(x1, x2) + x, min(y1, y2) + y,
+                         max(x1, x2) + x, max(y1, y2) + y)
+
+    def calculate_bounding_box(self):
+        return self.bounding_box
+
+    def move(self, x, y):
+        coordinates = self._coordinates
+        offset = self._offset
+        coordinates[offset] += x
+        coordinates[offset + 1] += y
+        coordinates[offset + 2] += x
+        coordinates[offset + 3] += y
+
+
+class CompactShape(Shape):
+
+    def __init__(self):
+        """Creates a CompactShape object.
+
+        A Shape keeping the coordinates of all its primitives on a single
+        array('d') buffer, four values (x1, y1, x2, y2) for each one, the
+        outer loop first and the inner loops after it. The primitives are
+        LineView objects on the buffer. With NumPy the segments array is a
+        view of the buffer too.
+
+        A move only changes the origin added to the coordinates, the buffer
+        is never written by the shape, so it can be shared, see
+        ShapeCatalogue.
+
+        The loops are set at once, appending to the lists returned by
+        outer_loop and inner_loops doesn't change the shape.
+        """
+
+        # Used by the loop setters called from Shape.__init__.
+        self._coordinates = array.array("d")
+        self._start = 0
+        self._end = 0
+        self._origin = array.array("d", (0.0, 0.0))
+        self._loop_sizes = []
+        self._views = []
+        self._lowest_index = None
+        self._lowest_point = Point()
+
+        super(CompactShape, self).__init__()
+
+    @staticmethod
+    def from_shape(shape):
+        """Creates a CompactShape with the loops and the id of the shape.
+
+        Parameters:
+            shape a Shape object.
+        Return:
+            A updated CompactShape object.
+        """
+
+        compact = CompactShape()
+        compact.id = shape.id
+        compact.orientation = shape.orientation
+        compact.set_loops(shape.outer_loop, shape.inner_loops)
+        compact.update()
+
+        return compact
+
+    @staticmethod
+    def from_coordinates(shape_id, orientation, coordinates, loop_sizes,
+                         start=0, hierarchy=None):
+        """Creates a CompactShape on a coordinates buffer.
+
+        Parameters:
+            shape_id a integer.
+            orientation a integer, the index of the orientation.
+            coordinates a array('d') object, or other buffer of doubles,
+                see CompactShape. It is not copied.
+            loop_sizes a list with the number of primitives of each loop,
+                the outer loop first.
+            start a integer, the index of the first coordinate of the shape
+                on the buffer.
+            hierarchy a BoundingVolumeHierarchy, see update.
+        Return:
+            A updated CompactShape object.
+        """
+
+        compact = CompactShape()
+        compact.id = shape_id
+        compact.orientation = orientation
+        compact.set_coordinates(coordinates, loop_sizes, start)
+        compact.update(hierarchy)
+
+        return compact
+
+    def set_loops(self, outer_loop, inner_loops):
+        coordinates = array.array("d")
+        loop_sizes = []
+        for loop in [outer_loop] + list(inner_loops):
+            for primitive in loop:
+                coordinates.extend((primitive.x1, primitive.y1,
+                                    primitive.x2, primitive.y2))
+            loop_sizes.append(len(loop))
+
+        self.set_coordinates(coordinates, loop_sizes)
+
+    def set_coordinates(self, coordinates, loop_sizes, start=0):
+        self._coordinates = coordinates
+        self._start = start
+        self._end = start + sum(loop_sizes) * 4
+        self._origin = array.array("d", (0.0, 0.0))
+        self._loop_sizes = list(loop_sizes)
+        self._lowest_index = None
+        self.bvh = None
+        self._create_views()
+
+    def _create_views(self):
+        coordinates = self._coordinates
+        origin = self._origin
+        self._views = [LineView(coordinates, offset, origin)
+                       for offset in xrange(self._start, self._end, 4)]
+
+        self.segments = None
+        if kernels.available() and self._end > self._start:
+            self.segments = kernels.numpy.frombuffer(coordinates,
+                kernels.numpy.float64)[self._start:self._end].reshape(-1, 4)
+
+    @property
+    def outer_loop(self):
+        if not self._loop_sizes:
+            return []
+        return self._views[:self._loop_sizes[0]]
+
+    @outer_loop.setter
+    def outer_loop(self, value):
+        self.set_loops(value, self.inner_loops)
+
+    @property
+    def inner_loops(self):
+        loops = []
+        begin = self._loop_sizes[0] if self._loop_sizes else 0
+        for size in self._loop_sizes[1:]:
+            loops.append(self._views[begin:begin + size])
+            begin += size
+
+        return loops
+
+    @inner_loops.setter
+    def inner_loops(self, value):
+        self.set_loops(self.outer_loop, value)
+
+    @property
+    def lowest_point(self):
+        if self._lowest_index is None:
+            return self._lowest_point
+
+        coordinates = self._coordinates
+        offset = self._lowest_index
+        return Point(coordinates[offset] + self._origin[0],
+                     coordinates[offset + 1] + self._origin[1])
+
+    @lowest_point.setter
+    def lowest_point(self, value):
+        self._lowest_index = None
+        self._lowest_point = value
+
+    @property
+    def segments(self):
+        x, y = self._origin
+        if self._segments is not None and (x or y):
+            return self._segments + (x, y, x, y)
+        return self._segments
+
+    @segments.setter
+    def segments(self, value):
+        self._segments = value
+
+    def move(self, x, y):
+        self.translate(self._origin[0] + x, self._origin[1] + y)
+
+    def pending_bounds(self):
+        return self._bounds
+
+    def translate(self, x, y):
+        """Sets the origin, see Shape.translate."""
+
+        origin = self._origin
+        dx, dy = x - origin[0], y - origin[1]
+        origin[0] = x
+        origin[1] = y
+
+        left, bottom, right, top = self._bounds
+        bounding_box = self.bounding_box
+        bounding_box.left = left + x
+        bounding_box.bottom = bottom + y
+        bounding_box.right = right + x
+        bounding_box.top = top + y
+        if self.bvh:
+            self.bvh.move(dx, dy)
+
+    def update(self, hierarchy=None):
+        """Updates the bounding box, the lowest point and the hierarchy.
+
+        Parameters:
+            hierarchy a BoundingVolumeHierarchy of a shape with the same
+                coordinates and origin, shared instead of building another.
+        """
+
+        self.calculate_bounding_box()
+        self.calculate_lowest_point()
+        if hierarchy is None:
+            self.bvh = BoundingVolumeHierarchy(self._views)
+        else:
+            self.bvh = hierarchy.share(self._views)
+
+    def primitive(self, index):
+        return self._views[index]
+
+    def contains_point(self, point, vectorized=False):
+        if vectorized:
+            return super(CompactShape, self).contains_point(point, vectorized)
+
+        if not point.intersect_rectangle(self.bounding_box):
+            return False
+
+        x, y = point.x - self._origin[0], point.y - self._origin[1]
+        coordinates = self._coordinates
+        odd_nodes = False
+        for i in xrange(self._start, self._end, 4):
+            x1, y1, x2, y2 = coordinates[i:i + 4]
+            if (y2 < y and y1 >= y) or (y1 < y and y2 >= y):
+                if x2 + (y - y2) / (y1 - y2) * (x1 - x2) < x:
+                    odd_nodes = not odd_nodes
+
+        return odd_nodes
+
+    def calculate_lowest_point(self):
+        local_origin = self.bounding_box.left_bottom
+        coordinates = self._coordinates
+        x, y = self._origin
+        start = self._start
+        self._lowest_index = start
+        lowest_distance = self.lowest_point.distance(local_origin)
+
+        for offset in xrange(start + 4, start + self._loop_sizes[0] * 4, 4):
+            point = Point(coordinates[offset] + x, coordinates[offset + 1] + y)
+            distance = point.distance(local_origin)
+            if distance < lowest_distance:
+                self._lowest_index = offset
+                lowest_distance = distance
+
+    def calculate_bounding_box(self):
+        outer = self._coordinates[self._start:
+                                  self._start + self._loop_sizes[0] * 4]
+        xs = outer[0::2]
+        ys = outer[1::2]
+        self._bounds = (min(xs), min(ys), max(xs), max(ys))
+        x, y = self._origin
+        left, bottom, right, top = self._bounds
+        self.bounding_box = Rectangle(left + x, bottom + y, right + x, top + y)
+
+    def outer_loop_iterator(self):
+        return iter(self.outer_loop)
+
+    def outer_loop_size(self):
+        return self._loop_sizes[0] if self._loop_sizes else 0
+
+    def outer_points(self):
+        coordinates = self._coordinates
+        x, y = self._origin
+        start = self._start
+        for offset in xrange(start, start + self.outer_loop_size() * 4, 4):
+            yield Point(coordinates[offset] + x, coordinates[offset + 1] + y)
+
+    def inner_loops_iterator(self):
+        return iter(self._views[len(self.outer_loop):])
+
+    def primitive_iterator(self):
+        return iter(self._views)
+
+    def __getstate__(self):
+        # The views and the NumPy array are created again from the buffer,
+        # a shared buffer is copied.
+        state = self.__dict__.copy()
+        del state["_views"]
+        del state["_segments"]
+        if not isinstance(self._coordinates, array.array):
+            state["_coordinates"] = array.array("d",
+                self._coordinates[self._start:self._end])
+            if self._lowest_index is not None:
+                state["_lowest_index"] = self._lowest_index - self._start
+            state["_start"] = 0
+            state["_end"] = self._end - self._start
+        if self.bvh:
+            state["bvh"] = copy.copy(self.bvh)
+            state["bvh"].primitives = None
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if "_origin" not in state:
+            self._start = 0
+            self._end = len(self._coordinates)
+            self._origin = array.array("d", (0.0, 0.0))
+        self._create_views()
+        if self.bvh:
+            self.bvh.primitives = self._views
@@ -0,0 +1,219 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Batch versions of the primitive tests, working on (N, 4) arrays of segments
+# where each row is (x1, y1, x2, y2). NumPy is optional, without it available()
+# returns False and the shapes keep using the primitive by primitive tests.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def available():
+    return numpy is not None
+
+def segment_array(primitives):
+    """Creates the segment array of a sequence of primitives.
+
+    Parameters:
+        primitives a iterable of Primitives.
+    Return:
+        A (N, 4) float64 array.
+    """
+
+    coordinates = [(p.x1, p.y1, p.x2, p.y2) for p in primitives]
+    return numpy.array(coordinates, dtype=numpy.float64).reshape(-1, 4)
+
+def _point_in_segment(px, py, x1, y1, x2, y2, epsilon):
+    cross_product = ((py - y1) * (x2 - x1) - (px - x1) * (y2 - y1))
+    dot_product = (px - x1) * (x2 - x1) + (py - y1) * (y2 - y1)
+    squared_length = (x2 - x1) * (x2 - x1) + (y2 - y1) * (y2 - y1)
+
+    return ((numpy.abs(cross_product) < epsilon) & (dot_product >= 0.0) &
+            (dot_product <= squared_length))
+
+def box_pairs(segments, other_segments):
+    """Finds the pairs of segments whose bounding boxes intersect.
+
+    Parameters:
+        segments a (N, 4) array.
+        other_segments a (M, 4) array.
+    Return:
+        A (rows, columns) tuple of index arrays, in row-major order.
+    """
+
+    x1, y1, x2, y2 = [segments[:, i:i + 1] for i in xrange(4)]
+    x3, y3, x4, y4 = [other_segments[:, i] for i in xrange(4)]
+
+    boxes = ((numpy.minimum(x1, x2) <= numpy.maximum(x3, x4)) &
+             (numpy.maximum(x1, x2) >= numpy.minimum(x3, x4)) &
+             (numpy.minimum(y1, y2) <= numpy.maximum(y3, y4)) &
+             (numpy.maximum(y1, y2) >= numpy.minimum(y3, y4)))
+
+    return numpy.nonzero(boxes)
+
+def _intersect(segments, other_segments, epsilon):
+    # Tests segments[k] against other_segments[k], the boxes already
+    # intersect.
+    x1, y1, x2, y2 = [segments[:, i] for i in xrange(4)]
+    x3, y3, x4, y4 = [other_segments[:, i] for i in xrange(4)]
+
+    ax, ay = x2 - x1, y2 - y1
+    bx, by = x3 - x4, y3 - y4
+    cx, cy = x1 - x3, y1 - y3
+
+    denominator = (ay * bx) - (ax * by)
+    parallel = numpy.abs(denominator) < epsilon
+    safe_denominator = numpy.where(parallel, 1.0, denominator)
+
+    alpha = ((by * cx) - (bx * cy)) / safe_denominator
+    beta = ((ax * cy) - (ay * cx)) / safe_denominator
+    hits = ((~parallel) & (alpha >= 0.0) & (alpha <= 1.0) &
+            (beta >= 0.0) & (beta <= 1.0))
+
+    # The parallel pairs are few, only they are tested for a collinear
+    # range.
+    parallel = numpy.flatnonzero(parallel)
+    if len(parallel):
+        x1, y1, x2, y2, x3, y3, x4, y4 = [values[parallel] for values in
+                                          (x1, y1, x2, y2, x3, y3, x4, y4)]
+        collinear = (numpy.abs((y1 - y3) * (x4 - x3) -
+                               (x1 - x3) * (y4 - y3)) < epsilon)
+        hits[parallel] = (collinear &
+            (_point_in_segment(x1, y1, x3, y3, x4, y4, epsilon) |
+             _point_in_segment(x2, y2, x3, y3, x4, y4, epsilon)) &
+            (_point_in_segment(x3, y3, x1, y1, x2, y2, epsilon) |
+             _point_in_segment(x4, y4, x1, y1, x2, y2, epsilon)))
+
+    return hits
+
+def intersect_pairs(segments, other_segments, epsilon=1e-06):
+    """Finds the intersecting pairs between two segment arrays.
+
+    A pair intersects when their bounding boxes intersect and
+    Line.intersect_line finds a point or a collinear range, using the same
+    epsilon as util.almost_equal. Only the pairs whose boxes intersect are
+    tested.
+
+    Parameters:
+        segments a (N, 4) array.
+        other_segments a (M, 4) array.
+        epsilon a real number.
+    Return:
+        A (rows, columns) tuple of index arrays, in row-major order.
+    """
+
+    rows, columns = box_pairs(segments, other_segments)
+    if len(rows):
+        hits = _intersect(segments[rows], other_segments[columns], epsilon)
+        rows, columns = rows[hits], columns[hits]
+
+    return rows, columns
+
+def intersect_matrix(segments, other_segments, epsilon=1e-06):
+    """Tests every segment against every other segment, see intersect_pairs.
+
+    Parameters:
+        segments a (N, 4) array.
+        other_segments a (M, 4) array.
+        epsilon a real number.
+    Return:
+        A (N, M) bool array.
+    """
+
+    matrix = numpy.zeros((len(segments), len(other_segments)), dtype=bool)
+    matrix[intersect_pairs(segments, other_segments, epsilon)] = True
+
+    return matrix
+
+def intersect_segments(segments, other_segments, first=False, epsilon=1e-06):
+    """Finds the intersecting pairs between two segment arrays.
+
+    Parameters:
+        segments a (N, 4) array.
+        other_segments a (M, 4) array.
+        first a bool value.
+        epsilon a real number.
+    Return:
+        A list of (i, j) index pairs in row-major order, or when first is True
+        the first of those pairs and None if there is no intersection.
+    """
+
+    if not len(segments) or not len(other_segments):
+        return None if first else []
+
+    rows, columns = intersect_pairs(segments, other_segments, epsilon)
+    if first:
+        if not len(rows):
+            return None
+        return (int(rows[0]), int(columns[0]))
+
+    return zip(rows.tolist(), columns.tolist())
+
+def intersect_first(segments, arrays, epsilon=1e-06):
+    """Finds the first of the arrays with a segment intersecting the
+    segments, testing all of them in one call.
+
+    Parameters:
+        segments a (N, 4) array.
+        arrays a list of (M, 4) arrays.
+        epsilon a real number.
+    Return:
+        A (k, i, j) tuple, the index of the first array intersecting and its
+        first pair in row-major order, or None if there is no intersection.
+    """
+
+    if not len(segments) or not arrays:
+        return None
+
+    ends = numpy.cumsum([len(array) for array in arrays])
+    rows, columns = intersect_pairs(segments, numpy.concatenate(arrays),
+                                    epsilon)
+    if not len(rows):
+        return None
+
+    owners = numpy.searchsorted(ends, columns, "right")
+    k = int(owners.min())
+    index = numpy.flatnonzero(owners == k)[0]
+    start = ends[k] - len(arrays[k])
+
+    return (k, int(rows[index]), int(columns[index] - start))
+
+def contains_points(segments, points):
+    """Checks which points are inside the loops of the segments, using the
+    same crossing rule of Shape.contains_point.
+
+    Parameters:
+        segments a (N, 4) array.
+        points a (K, 2) array.
+    Return:
+        A (K,) bool array.
+    """
+
+    x1, y1, x2, y2 = [segments[:, i] for i in xrange(4)]
+    px = points[:, 0:1]
+    py = points[:, 1:2]
+
+    crossing = (((y2 < py) & (y1 >= py)) | ((y1 < py) & (y2 >= py)))
+    safe_dy = numpy.where(y1 == y2, 1.0, y1 - y2)
+    x_value = x2 + (py - y2) / safe_dy * (x1 - x2)
+
+    return (numpy.count_nonzero(crossing & (x_value < px), axis=1) % 2) == 1
@@ -27,6 +27,9 @@ from ippl.shape.rectangle import Rectangle
 
 class Line(object):
 
+    # The lines are the most numerous objects, they have no __dict__.
+    __slots__ = ("begin", "end", "bounding_box")
+
     @staticmethod
     def horizontal_line():
         return Line(Point(0, 0), Point(1, 0))
@@ -127,8 +130,9 @@ class Line(object):
 
         if ((ignore_alpha or (0.0 <= alpha <= 1.0)) and
                 (ignore_beta or (0.0 <= beta <= 1.0))):
-            return Point(self.begin.x + alpha * (self.end.x - self.begin.x),
-                         self.begin.y + alpha * (self.end.y - self.begin.y))
+            begin, end = self.begin, self.end
+            return Point(begin.x + alpha * (end.x - begin.x),
+                         begin.y + alpha * (end.y - begin.y))
 
         return None
 
@@ -151,18 +155,20 @@ class Line(object):
 
         result = { "alpha": None, "beta": None, "denominator": 0.0 }
 
-        a = Point(self.end.x - self.begin.x, self.end.y - self.begin.y)
-        b = Point(line.begin.x - line.end.x, line.begin.y - line.end.y)
-        c = Point(self.begin.x - line.begin.x, self.begin.y - line.begin.y)
+        begin, end = self.begin, self.end
+        line_begin, line_end = line.begin, line.end
+        ax, ay = end.x - begin.x, end.y - begin.y
+        bx, by = line_begin.x - line_end.x, line_begin.y - line_end.y
+        cx, cy = begin.x - line_begin.x, begin.y - line_begin.y
 
-        denominator = (a.y * b.x) - (a.x * b.y)
+        denominator = (ay * bx) - (ax * by)
         result["denominator"] = denominator
 
         if almost_equal(denominator, 0.0):
             return result
 
-        result["alpha"] = ((b.y * c.x) - (b.x * c.y)) / denominator
-        result["beta"] = ((a.x * c.y) - (a.y * c.x)) / denominator
+        result["alpha"] = ((by * cx) - (bx * cy)) / denominator
+        result["beta"] = ((ax * cy) - (ay * cx)) / denominator
 
         return result
 
@@ -23,6 +23,8 @@ from ippl import util
 
 class Point(object):
 
+    __slots__ = ("_x", "_y")
+
     def __init__(self, x=0, y=0):
         """Creates a Point object.
 
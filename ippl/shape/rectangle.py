@@ -23,6 +23,8 @@ from ippl.shape.point import Point
 
 class Rectangle(object):
 
+    __slots__ = ("_left_bottom", "_right_top")
+
     def __init__(self, left=0, bottom=0, right=0, top=0):
         """Creates a Rectangle object.
 
@@ -18,10 +18,13 @@
 #
 
 import copy
+import itertools
 
 from ippl.shape.point import Point
 from ippl.shape.rectangle import Rectangle
 from ippl.shape.line import Line
+from ippl.shape.bvh import BoundingVolumeHierarchy
+from ippl.shape import kernels
 from ippl import util
 
 
@@ -37,32 +40,180 @@ class Shape(object):
 
         super(Shape, self).__init__()
 
+        # The translation not applied to the primitives yet. The moves only
+        # add to it, the primitives are moved when they are accessed. They
+        # get the whole translation at once instead of one add for each move,
+        # so their coordinates differ on the last digits (up to about 1e-11)
+        # from the ones of the step by step moves, with the same layouts.
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+
         self.id = 0
+        self.orientation = 0
 
         self.outer_loop = []
         self.inner_loops = []
 
         self.lowest_point = Point()
         self.bounding_box = Rectangle();
+        self.bvh = None
+        self.segments = None
+
+    @property
+    def outer_loop(self):
+        self.apply_offset()
+        return self._outer_loop
+
+    @outer_loop.setter
+    def outer_loop(self, value):
+        self.apply_offset()
+        self._outer_loop = value
+
+    @property
+    def inner_loops(self):
+        self.apply_offset()
+        return self._inner_loops
+
+    @inner_loops.setter
+    def inner_loops(self, value):
+        self.apply_offset()
+        self._inner_loops = value
+
+    @property
+    def lowest_point(self):
+        self.apply_offset()
+        return self._lowest_point
+
+    @lowest_point.setter
+    def lowest_point(self, value):
+        self._lowest_point = value
+
+    @property
+    def segments(self):
+        """The segment array of the primitives, where they are."""
+
+        offset_x, offset_y = self.offset_x, self.offset_y
+        if self._segments is not None and (offset_x or offset_y):
+            return self._segments + (offset_x, offset_y, offset_x, offset_y)
+        return self._segments
+
+    @segments.setter
+    def segments(self, value):
+        self._segments = value
 
     def position(self, x, y):
-        x, y = (x - self.bounding_box.left, y - self.bounding_box.bottom)
-        self.move(x, y)
+        left, bottom, right, top = self.pending_bounds()
+        self.translate(x - left, y - bottom)
 
     def move(self, x, y):
-        for primitive in self.primitive_iterator():
-            primitive.move(x, y)
+        self.translate(self.offset_x + x, self.offset_y + y)
+
+    def pending_bounds(self):
+        """The bounding box of the primitives, without the pending offset.
+
+        Return:
+            A (left, bottom, right, top) tuple.
+        """
+
+        if not (self.offset_x or self.offset_y):
+            bounding_box = self.bounding_box
+            self._bounds = (bounding_box.left, bounding_box.bottom,
+                            bounding_box.right, bounding_box.top)
+        return self._bounds
+
+    def translate(self, offset_x, offset_y):
+        """Sets the pending offset. The bounding box gets the whole offset, as
+        the primitives do, so the shape is at the same place whatever the
+        moves before were.
+        """
+
+        left, bottom, right, top = self.pending_bounds()
+        x, y = offset_x - self.offset_x, offset_y - self.offset_y
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+
+        bounding_box = self.bounding_box
+        bounding_box.left = left + offset_x
+        bounding_box.bottom = bottom + offset_y
+        bounding_box.right = right + offset_x
+        bounding_box.top = top + offset_y
+        if self.bvh:
+            self.bvh.move(x, y)
+
+    def apply_offset(self):
+        """Moves the primitives by the pending offset."""
+
+        offset_x, offset_y = self.offset_x, self.offset_y
+        if not (offset_x or offset_y):
+            return
+
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+        for primitive in self._outer_loop:
+            primitive.move(offset_x, offset_y)
+        for loop in self._inner_loops:
+            for primitive in loop:
+                primitive.move(offset_x, offset_y)
+
+        if self._segments is not None:
+            self._segments += (offset_x, offset_y, offset_x, offset_y)
+
+    def translated(self, primitive):
+        """Returns the primitive of this shape where it is, a moved copy of it
+        while the offset is pending.
+
+        Parameters:
+            primitive a Line object of this shape.
+        Return:
+            A Line object.
+        """
 
-        self.bounding_box.move(x, y)
+        offset_x, offset_y = self.offset_x, self.offset_y
+        if not (offset_x or offset_y):
+            return primitive
+
+        line = Line(Point(primitive.x1 + offset_x, primitive.y1 + offset_y),
+                    Point(primitive.x2 + offset_x, primitive.y2 + offset_y))
+        line.calculate_bounding_box()
+        return line
+
+    def outer_points(self):
+        """Iterates over the begin points of the outer loop where they are,
+        without applying the offset.
+        """
+
+        offset_x, offset_y = self.offset_x, self.offset_y
+        if not (offset_x or offset_y):
+            for primitive in self._outer_loop:
+                yield primitive.begin
+        else:
+            for primitive in self._outer_loop:
+                yield Point(primitive.x1 + offset_x, primitive.y1 + offset_y)
 
     def update(self):
         self.calculate_bounding_box()
         self.calculate_lowest_point()
+        self.bvh = BoundingVolumeHierarchy(self.primitive_iterator())
+        if kernels.available():
+            self.segments = kernels.segment_array(self.primitive_iterator())
 
-    def contains_point(self, point):
+    def primitive(self, index):
+        """Returns the primitive at the index of the primitive_iterator, see
+        translated.
+        """
+
+        primitives = itertools.chain(self._outer_loop, *self._inner_loops)
+        primitive = next(itertools.islice(primitives, index, None))
+        return self.translated(primitive)
+
+    def contains_point(self, point, vectorized=False):
         if not point.intersect_rectangle(self.bounding_box):
             return False
 
+        if vectorized and self.segments is not None:
+            points = kernels.numpy.array([(point.x, point.y)])
+            return bool(kernels.contains_points(self.segments, points)[0])
+
         odd_nodes = False
         for primitive in self.primitive_iterator():
             if ((primitive.y2 < point.y and primitive.y1 >= point.y) or
@@ -156,6 +307,16 @@ class Shape(object):
             for primitive in loop:
                 yield primitive
 
+    def outer_loop_size(self):
+        return len(self._outer_loop)
+
+    def segment_count(self):
+        """The number of rows of the segment array, 0 without NumPy."""
+
+        if self._segments is None:
+            return 0
+        return len(self._segments)
+
     def primitive_iterator(self):
         for primitive in self.outer_loop_iterator():
             yield primitive
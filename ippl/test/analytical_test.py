@@ -0,0 +1,79 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+import time
+
+from ippl.bottom_left_fill import *
+from ippl.shape.catalogue import ShapeCatalogue
+from ippl.reader import *
+
+collision_tests = [0]
+intersect_primitives = BottomLeftFill.intersect_primitives
+
+def counted_intersect_primitives(primitive1, primitive2):
+    collision_tests[0] += 1
+    return intersect_primitives(primitive1, primitive2)
+
+BottomLeftFill.intersect_primitives = staticmethod(
+    counted_intersect_primitives)
+
+def sort_by_area(shapes):
+    shape = shapes[0]
+    return shape.calculate_area()
+
+def layout(name, analytical, compact=False, resolution=(100, 1)):
+    blf_data = BLFReader().load("data/blf/" + name)
+    shapes = blf_data["shapes"]
+    if compact:
+        shapes = ShapeCatalogue(shapes).shapes()
+
+    blf = BottomLeftFill()
+    blf.resolution = Point(*resolution)
+    blf.analytical = analytical
+    size = blf_data["profile"]["size"]
+    blf.sheetshape.rectangle = Rectangle(0, 0, size[0] + 1, size[1] + 1)
+    blf.shapes = shapes
+    blf.shapes.sort(key=sort_by_area, reverse=True)
+
+    collision_tests[0] = 0
+    t = time.time()
+    blf.run()
+    t = time.time() - t
+    boxes = [(shape.id, round(shape.bounding_box.left, 6),
+              round(shape.bounding_box.bottom, 6))
+             for shape in blf.sheetshape]
+
+    return t, collision_tests[0], boxes
+
+if __name__ == "__main__":
+    # The jumps put the shapes where the steps of slide_up put them.
+    for name, compact, resolution in [("profile1", False, (100, 1)),
+                                      ("profile7", False, (100, 1)),
+                                      ("profile7", True, (25, 1)),
+                                      ("profile8", False, (100, 1)),
+                                      ("profile8", True, (100, 1))]:
+        t, tests, expected = layout(name, False, compact, resolution)
+        analytical_t, analytical_tests, found = layout(name, True, compact,
+                                                       resolution)
+        print "{} (compact {}, resolution {})".format(name, compact,
+                                                      resolution)
+        print "Slide time: {:.2f}, collision tests: {}".format(t, tests)
+        print "Jump time: {:.2f}, collision tests: {}".format(analytical_t,
+            analytical_tests)
+        print "Same layout:", found == expected
+        assert found == expected
@@ -0,0 +1,77 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import tempfile
+
+from ippl.bottom_left_fill import *
+from ippl.reader import *
+
+def sort_by_area(shapes):
+    shape = shapes[0]
+    return shape.calculate_area()
+
+def outlines(shapes):
+    return [[(shape.id, shape.orientation,
+              [(p.x1, p.y1, p.x2, p.y2) for p in shape.primitive_iterator()])
+             for shape in orientations] for orientations in shapes]
+
+def layout(blf_data):
+    blf = BottomLeftFill()
+    blf.resolution = Point(1, 1)
+    size = blf_data["profile"]["size"]
+    blf.sheetshape.rectangle = Rectangle(0, 0, size[0] + 1, size[1] + 1)
+    blf.shapes = blf_data["shapes"]
+    blf.shapes.sort(key=sort_by_area, reverse=True)
+    bounding_box = blf.run()
+
+    return (str(bounding_box),
+            [(shape.id, shape.orientation, str(shape.bounding_box))
+             for shape in blf.sheetshape])
+
+if __name__ == "__main__":
+    handle, filename = tempfile.mkstemp()
+    os.close(handle)
+
+    try:
+        for profile in ["data/blf/profile1", "data/blf/profile7"]:
+            # The same file converted by: python -m ippl.reader --convert
+            BLFReader.save_binary(BLFReader().load(profile), filename)
+
+            for compact in [False, True]:
+                reader = BLFReader()
+                reader.compact = compact
+                text_data = reader.load(profile)
+                binary_data = reader.load(filename)
+
+                print "{} (compact {}):".format(profile, compact)
+                print "Binary format? {}".format(BLFReader.is_binary(filename))
+                print "Same signature? {}".format(
+                    text_data["signature"] == binary_data["signature"])
+                print "Same profile? {}".format(
+                    text_data["profile"] == binary_data["profile"])
+                print "Same shapes? {}".format(outlines(text_data["shapes"]) ==
+                    outlines(binary_data["shapes"]))
+
+                text_layout = layout(text_data)
+                print "Sheet shape bounding box:", text_layout[0]
+                print "Same layout? {}".format(
+                    text_layout == layout(binary_data))
+    finally:
+        os.remove(filename)
@@ -0,0 +1,75 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import random
+
+from ippl.bottom_left_fill import *
+from ippl.shape.catalogue import ShapeCatalogue
+from ippl.reader import *
+from blf_genetic.utils import BLFChromosome
+
+def layout(blf_data, genes, orientations=None):
+    chromosome = BLFChromosome()
+    chromosome.genes = list(genes)
+    chromosome.orientations = orientations
+    sheetshape = chromosome.calculate_fitness(blf_data)
+    boxes = [(s.id, s.orientation, s.bounding_box.left, s.bounding_box.bottom)
+             for s in sheetshape]
+
+    return chromosome.fitness, boxes
+
+if __name__ == "__main__":
+    reader = BLFReader()
+    blf_data = reader.load("data/blf/profile1")
+    blf_data["resolution"] = (1, 1)
+    # The compact shapes are placed the same wherever the runs before left
+    # them, the layouts of the runs can be compared exactly.
+    blf_data["shapes"] = ShapeCatalogue(blf_data["shapes"]).shapes()
+    shapes = blf_data["shapes"]
+
+    # Each chromosome shares a random prefix with the previous one, as the
+    # children of a crossover do.
+    genes = range(len(shapes))
+    chromosomes = []
+    for _ in xrange(30):
+        size = random.randint(0, len(genes))
+        suffix = genes[size:]
+        random.shuffle(suffix)
+        genes = genes[:size] + suffix
+        orientations = None
+        if random.random() < 0.5:
+            orientations = [random.randrange(len(o)) for o in shapes]
+        chromosomes.append((list(genes), orientations))
+
+    # Without checkpoints kept every shape is placed from scratch.
+    blf_data["checkpoints"] = 0
+    checkpoint_store.clear()
+    expected = [layout(blf_data, genes, orientations)
+                for genes, orientations in chromosomes]
+
+    blf_data["checkpoints"] = 256
+    checkpoint_store.clear()
+    mismatches = 0
+    for i in xrange(len(chromosomes)):
+        genes, orientations = chromosomes[i]
+        if layout(blf_data, genes, orientations) != expected[i]:
+            mismatches += 1
+
+    print checkpoint_store
+    print "Restored layout mismatches: {}".format(mismatches)
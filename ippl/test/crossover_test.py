@@ -0,0 +1,57 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import random
+
+from ippl.genetic_algorithm import crossover
+
+def random_parents(gene_number):
+    genes = random.sample(xrange(1000), gene_number)
+    p1 = list(genes)
+    p2 = list(genes)
+    random.shuffle(p1)
+    random.shuffle(p2)
+
+    return p1, p2
+
+if __name__ == "__main__":
+    operators = [crossover.cycle, crossover.partially_mapped,
+                 crossover.order, crossover.edge_recombination]
+
+    for operator in operators:
+        invalid = 0
+        for _ in xrange(2000):
+            # From a single gene to a few dozens, the small ones put the cut
+            # points on the ends.
+            p1, p2 = random_parents(random.randint(1, 40))
+            offspring = operator([p1, p2])
+            if len(offspring) != len(p1) or sorted(offspring) != sorted(p1):
+                invalid += 1
+
+        print "{}: invalid children: {}".format(operator.__name__, invalid)
+
+    # The cycle crossover also keeps every gene on the position it has on
+    # one of the parents.
+    misplaced = 0
+    for _ in xrange(2000):
+        p1, p2 = random_parents(random.randint(1, 40))
+        offspring = crossover.cycle([p1, p2])
+        misplaced += sum(1 for i in xrange(len(p1))
+                         if offspring[i] not in (p1[i], p2[i]))
+    print "cycle: misplaced genes: {}".format(misplaced)
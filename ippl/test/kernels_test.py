@@ -0,0 +1,72 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import random
+
+from ippl.shape import *
+
+def random_line():
+    # Integer coordinates on a small grid produce plenty of collinear and
+    # touching segments.
+    return Line(Point(random.randint(0, 10), random.randint(0, 10)),
+                Point(random.randint(0, 10), random.randint(0, 10)))
+
+if __name__ == "__main__":
+    if not kernels.available():
+        print "NumPy is not installed."
+    else:
+        lines = [random_line() for _ in xrange(200)]
+        for line in lines:
+            line.calculate_bounding_box()
+        segments = kernels.segment_array(lines)
+
+        expected = []
+        for i in xrange(len(lines)):
+            for j in xrange(len(lines)):
+                a, b = lines[i], lines[j]
+                if (a.bounding_box.intersect_rectangle(b.bounding_box) and
+                        a.intersect_line(b)):
+                    expected.append((i, j))
+
+        result = kernels.intersect_segments(segments, segments)
+        print "Intersecting pairs: {}".format(len(expected))
+        print "Kernel matches Line.intersect_line? {}".format(
+            result == expected)
+
+        arrays = [segments[:50], segments[50:120], segments[120:]]
+        expected = None
+        for k in xrange(len(arrays)):
+            pair = kernels.intersect_segments(segments[:10], arrays[k], True)
+            if pair:
+                expected = (k,) + pair
+                break
+        print "First intersection matches? {}".format(
+            kernels.intersect_first(segments[:10], arrays) == expected)
+
+        s = Shape()
+        s.outer_loop.append(Line(Point(0, 0), Point(10, 0)))
+        s.outer_loop.append(Line(Point(10, 0), Point(5, 10)))
+        s.outer_loop.append(Line(Point(5, 10), Point(0, 0)))
+        s.update()
+
+        points = [Point(random.uniform(-1, 11), random.uniform(-1, 11))
+                  for _ in xrange(1000)]
+        mismatches = [p for p in points
+                      if s.contains_point(p) != s.contains_point(p, True)]
+        print "Contains point mismatches: {}".format(len(mismatches))
@@ -0,0 +1,158 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+import argparse
+import time
+
+from ippl.nfp import *
+from ippl.nfp import geometry
+from ippl.reader import *
+
+EPSILON = 1e-06
+
+def sort_by_area(shapes):
+    shape = shapes[0]
+    return shape.calculate_area()
+
+def convex_overlap(first, second, epsilon):
+    """
+    Separating axis test of two convex polygons, touching edges are
+    not an overlap.
+    """
+    for polygon, other in ((first, second), (second, first)):
+        for x, y, nx, ny in geometry.edge_normals(polygon, epsilon):
+            if all((px - x) * nx + (py - y) * ny <= epsilon for px, py in other):
+                return False
+    return True
+
+def overlapping_shapes(shapes, epsilon=EPSILON):
+    """
+    Return the pairs of indexes of the placed shapes that overlap.
+    """
+    pieces = []
+    for shape in shapes:
+        points = geometry.loop_points(shape.outer_loop)
+        polygons = geometry.convex_decomposition(points, epsilon)
+        pieces.append([(polygon, geometry.bounds(polygon)) for polygon in polygons])
+    pairs = []
+    for i in xrange(len(shapes)):
+        for j in xrange(i + 1, len(shapes)):
+            if not shapes[i].bounding_box.intersect_rectangle(shapes[j].bounding_box):
+                continue
+            for first, a in pieces[i]:
+                for second, b in pieces[j]:
+                    if a[0] < b[2] - epsilon and b[0] < a[2] - epsilon and \
+                       a[1] < b[3] - epsilon and b[1] < a[3] - epsilon and \
+                       convex_overlap(first, second, epsilon):
+                        pairs.append((i, j))
+                        break
+                else:
+                    continue
+                break
+    return pairs
+
+def outside_shapes(shapes, rectangle, epsilon=EPSILON):
+    """
+    Return the indexes of the placed shapes outside the sheet rectangle.
+    """
+    outside = []
+    for i, shape in enumerate(shapes):
+        bounding_box = shape.bounding_box
+        if bounding_box.left < rectangle.left - epsilon or \
+           bounding_box.bottom < rectangle.bottom - epsilon or \
+           bounding_box.right > rectangle.right + epsilon or \
+           bounding_box.top > rectangle.top + epsilon:
+            outside.append(i)
+    return outside
+
+def check_layout(nfp, count):
+    shapes = list(nfp.sheetshape)
+    overlapping = overlapping_shapes(shapes)
+    outside = outside_shapes(shapes, nfp.sheetshape.rectangle)
+    print "Placed shapes:", len(shapes)
+    print "Overlapping shapes:", overlapping
+    print "Shapes outside the sheet shape:", outside
+    assert len(shapes) == count
+    assert not overlapping
+    assert not outside
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="No fit polygon placement test")
+    parser.add_argument("--render", metavar="FILENAME",
+                        help="save an image of the profile7 layout")
+    args = parser.parse_args()
+
+    print "Loading data..."
+    t = time.time()
+    reader = BLFReader()
+    blf_data = reader.load("data/blf/profile7")
+    print "Loading time: {:.20f}".format(time.time() - t)
+
+    print "Initializing NFP..."
+    t = time.time()
+    nfp = NoFitPolygonPlacement()
+    size = blf_data["profile"]["size"]
+    sheetshape_rectangle = Rectangle(0, 0, size[0] + 1, size[1] + 1)
+    nfp.sheetshape.rectangle = sheetshape_rectangle
+    nfp.shapes = blf_data["shapes"]
+    nfp.shapes.sort(key=sort_by_area, reverse=True)
+
+    for shapes in nfp.shapes:
+        shape = shapes[0]
+        print "Shape {} area {}".format(shape.id, shape.calculate_area())
+
+    print "Initializing NFP time: {:.20f}".format(time.time() - t)
+    print len(nfp.shapes)
+
+    print "Running..."
+    t = time.time()
+    sheetshape_bounding_box = nfp.run()
+    print "Running NFP time: {:.20f}".format(time.time() - t)
+    print "Sheet shape bounding box:", sheetshape_bounding_box
+    check_layout(nfp, len(nfp.shapes))
+
+    if args.render:
+        print "Rendering..."
+        t = time.time()
+        rectangle = nfp.sheetshape.rectangle
+        size = rectangle.size()
+        render = Render()
+        render.image_size = (int(size[0]), int(size[1]))
+        render.initialize()
+        render.shapes(nfp.sheetshape)
+        render.save(args.render)
+        print "Rendering Image time: {:.20f}".format(time.time() - t)
+        print "Saved."
+
+    # The largest shapes of profile9, it has many orientations of shapes
+    # with many primitives.
+    print "Loading profile9..."
+    blf_data = reader.load("data/blf/profile9")
+    nfp = NoFitPolygonPlacement()
+    size = blf_data["profile"]["size"]
+    nfp.sheetshape.rectangle = Rectangle(0, 0, size[0] + 1, size[1] + 1)
+    shapes = blf_data["shapes"]
+    shapes.sort(key=sort_by_area, reverse=True)
+    nfp.shapes = shapes[:10]
+
+    print "Running profile9 ({} shapes)...".format(len(nfp.shapes))
+    t = time.time()
+    sheetshape_bounding_box = nfp.run()
+    print "Running NFP profile9 time: {:.20f}".format(time.time() - t)
+    print "Sheet shape bounding box:", sheetshape_bounding_box
+    check_layout(nfp, len(nfp.shapes))
@@ -0,0 +1,78 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+import time
+
+from ippl.shape import *
+from ippl.bottom_left_fill import *
+from ippl.reader import *
+
+def polygon(points):
+    shape = Shape()
+    points = [Point(x, y) for x, y in points]
+    for k in xrange(len(points)):
+        shape.outer_loop.append(Line(points[k], points[(k + 1) % len(points)]))
+    shape.update()
+    return shape
+
+def sort_by_area(shapes):
+    shape = shapes[0]
+    return shape.calculate_area()
+
+def layout(name, skyline):
+    blf_data = BLFReader().load("data/blf/" + name)
+    blf = BottomLeftFill()
+    blf.resolution = Point(100, 1)
+    blf.skyline = skyline
+    size = blf_data["profile"]["size"]
+    blf.sheetshape.rectangle = Rectangle(0, 0, size[0] + 1, size[1] + 1)
+    blf.shapes = blf_data["shapes"]
+    blf.shapes.sort(key=sort_by_area, reverse=True)
+
+    t = time.time()
+    blf.run()
+    t = time.time() - t
+    return t, [(shape.id, shape.bounding_box.left, shape.bounding_box.bottom)
+               for shape in blf.sheetshape]
+
+if __name__ == "__main__":
+    skyline = Skyline()
+    # A block, a bracket open on the right and a bridge over nothing.
+    skyline.append(polygon([(0, 0), (10, 0), (10, 5), (0, 5)]))
+    skyline.append(polygon([(10, 0), (30, 0), (30, 2), (15, 2), (15, 8),
+                            (30, 8), (30, 10), (10, 10)]))
+    skyline.append(polygon([(40, 3), (50, 3), (50, 4), (40, 4)]))
+
+    print "Skyline height [0, 10]:", skyline.height(0, 10)
+    print "Floor [0, 10]:", skyline.floor(0, 10)
+    print "Skyline height [16, 30]:", skyline.height(16, 30)
+    print "Floor [16, 30] (in the bracket):", skyline.floor(16, 30)
+    print "Floor [41, 49] (under the bridge):", skyline.floor(41, 49)
+    assert skyline.floor(0, 10) == 5
+    assert skyline.height(16, 30) == 10
+    assert skyline.floor(16, 30) == 2
+    assert skyline.floor(41, 49) == 0
+
+    # Starting the columns on the floor doesn't skip the holes, the shapes
+    # are put where they are without it.
+    for name in ["profile6", "profile7", "profile8"]:
+        t, expected = layout(name, False)
+        skyline_t, found = layout(name, True)
+        print "{} time: {:.2f}, with skyline: {:.2f}, same layout: {}".format(
+            name, t, skyline_t, found == expected)
+        assert found == expected
@@ -0,0 +1,86 @@
+#
+# Copyright (C) 2013-2014 Emerson Max de Medeiros Silva
+#
+# This file is part of ippl.
+#
+# ippl is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ippl is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with ippl.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import random
+
+from ippl.shape import *
+from ippl.bottom_left_fill import *
+
+def random_rectangle():
+    # Integer corners on a small grid put many edges on the cell borders.
+    x, y = random.randint(-20, 80), random.randint(-20, 80)
+    return Rectangle(x, y, x + random.randint(0, 30), y + random.randint(0, 30))
+
+def brute_force(rectangles, bounding_box):
+    return [i for i in xrange(len(rectangles))
+            if rectangles[i].intersect_rectangle(bounding_box)]
+
+if __name__ == "__main__":
+    rectangles = [random_rectangle() for _ in xrange(300)]
+    boxes = [random_rectangle() for _ in xrange(500)]
+    points = [(random.uniform(-25, 115), random.uniform(-25, 115))
+              for _ in xrange(500)]
+
+    for cell_size in [None, 1.0, 7.5, 200.0]:
+        index = GridIndex(cell_size)
+        for i in xrange(len(rectangles)):
+            index.insert(i, rectangles[i])
+
+        # The candidates are a superset of the overlapping items, in the
+        # order they were inserted.
+        mismatches = 0
+        for box in boxes:
+            candidates = index.query(box)
+            found = [i for i in candidates
+                     if rectangles[i].intersect_rectangle(box)]
+            if candidates != sorted(candidates) or (found !=
+                    brute_force(rectangles, box)):
+                mismatches += 1
+        for x, y in points:
+            candidates = index.query_point(x, y)
+            found = [i for i in candidates
+                     if rectangles[i].intersect_rectangle(Rectangle(x, y, x, y))]
+            if found != brute_force(rectangles, Rectangle(x, y, x, y)):
+                mismatches += 1
+
+        print "Cell size {}: query mismatches: {}".format(index.cell_size,
+                                                         mismatches)
+
+    sheetshape = RectangularSheetShape()
+    for rectangle in rectangles[:50]:
+        shape = Shape()
+        points = [Point(rectangle.left, rectangle.bottom),
+                  Point(rectangle.right, rectangle.bottom),
+                  Point(rectangle.right, rectangle.top),
+                  Point(rectangle.left, rectangle.top)]
+        for k in xrange(len(points)):
+            shape.outer_loop.append(Line(points[k],
+                                         points[(k + 1) % len(points)]))
+        shape.update()
+        sheetshape.append(shape)
+
+    mismatches = 0
+    for box in boxes:
+        found = [s for s in sheetshape.query(box)
+                 if s.bounding_box.intersect_rectangle(box)]
+        expected = [s for s in sheetshape
+                    if s.bounding_box.intersect_rectangle(box)]
+        if found != expected:
+            mismatches += 1
+    print "Sheet shape query mismatches: {}".format(mismatches)
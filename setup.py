@@ -25,9 +25,21 @@ ext_modules = [
     Extension("ippl/bottom_left_fill/algorithm", [
         "ippl/bottom_left_fill/algorithm.py"
     ]),
+    Extension("ippl/bottom_left_fill/checkpoint", [
+        "ippl/bottom_left_fill/checkpoint.py"
+    ]),
+    Extension("ippl/bottom_left_fill/parallel", [
+        "ippl/bottom_left_fill/parallel.py"
+    ]),
     Extension("ippl/bottom_left_fill/sheet_shape", [
         "ippl/bottom_left_fill/sheet_shape.py"
     ]),
+    Extension("ippl/bottom_left_fill/skyline", [
+        "ippl/bottom_left_fill/skyline.py"
+    ]),
+    Extension("ippl/bottom_left_fill/spatial_index", [
+        "ippl/bottom_left_fill/spatial_index.py"
+    ]),
     Extension("ippl/drawer/drawer", [
         "ippl/drawer/drawer.py"
     ]),
@@ -46,12 +58,33 @@ ext_modules = [
     Extension("ippl/genetic_algorithm/select", [
         "ippl/genetic_algorithm/select.py"
     ]),
+    Extension("ippl/nfp/algorithm", [
+        "ippl/nfp/algorithm.py"
+    ]),
+    Extension("ippl/nfp/cache", [
+        "ippl/nfp/cache.py"
+    ]),
+    Extension("ippl/nfp/geometry", [
+        "ippl/nfp/geometry.py"
+    ]),
     Extension("ippl/reader", [
         "ippl/reader.py"
     ]),
     Extension("ippl/render", [
         "ippl/render.py"
     ]),
+    Extension("ippl/shape/bvh", [
+        "ippl/shape/bvh.py"
+    ]),
+    Extension("ippl/shape/catalogue", [
+        "ippl/shape/catalogue.py"
+    ]),
+    Extension("ippl/shape/compact", [
+        "ippl/shape/compact.py"
+    ]),
+    Extension("ippl/shape/kernels", [
+        "ippl/shape/kernels.py"
+    ]),
     Extension("ippl/shape/line", [
         "ippl/shape/line.py"
     ]),